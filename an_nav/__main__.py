@@ -1,11 +1,18 @@
 import argparse
+import json
 import pathlib
-from .lark.ent import iter_ent
-from .utils import (
-    load_navarea
-    , load_entities
-    , iter_navarea_ent
+import sys
+from .batch import (
+    convert_map
+    , iter_bsp_files
+    , iter_convert_batch
+    , BUILD_FLAGS
+    , OUTPUT_MODES
 )
+from .graph import MAX_NODES
+from .lark.ent import ENT_PARSERS
+from .stats import PipelineStats
+from .utils import MERGE_ENGINES
 
 
 
@@ -19,7 +26,11 @@ parser = argparse.ArgumentParser(
 parser.add_argument(
     'bsp_file'
     , type=pathlib.Path
-    , help='BSP file path. The NAV file must be located at same directory.'
+    , nargs='+'
+    , help=str((
+        'BSP file path. The NAV file must be located at same directory.'
+        , 'Multiple files, directories or globs converts them in batch.'
+    ))
 )
 parser.add_argument(
     '--build-flag', '-f'
@@ -33,47 +44,213 @@ parser.add_argument(
         , 'Default "c"'
     ))
 )
-args = parser.parse_args()
-
-
-bsp_file = args.bsp_file
-nav_version, nav_areas = load_navarea( str(bsp_file.with_suffix(".nav")) )
-print(
-    f"NAV Version: {nav_version}"
-    , f"NAV Area Count: {len(nav_areas)}"
-    , sep="\n"
+parser.add_argument(
+    '--merge'
+    , type=str
+    , choices=MERGE_ENGINES
+    , default=MERGE_ENGINES[0]
+    , help=str((
+        'incremental = Merge each info_node as it is built.'
+        , 'cluster = Merge all overlapping info_node at once, may merge more.'
+        , f'Default "{MERGE_ENGINES[0]}"'
+    ))
+)
+parser.add_argument(
+    '--ent-parser'
+    , type=str
+    , choices=tuple( ENT_PARSERS )
+    , default=next( iter(ENT_PARSERS) )
+    , help=str((
+        'scanner = Read BSP entities with the single pass scanner.'
+        , 'lark = Read BSP entities with the Lark grammar.'
+        , f'Default "{next( iter(ENT_PARSERS) )}"'
+    ))
+)
+parser.add_argument(
+    '--nav-cache'
+    , type=pathlib.Path
+    , default=None
+    , help='Directory to keep parsed NAV snapshots, reused while the NAV is unchanged.'
+)
+parser.add_argument(
+    '--incremental'
+    , action='store_true'
+    , help=str((
+        'Reuse info_node of the previous run for unchanged nav areas, same output as a full run.'
+        , 'The state is kept in --nav-cache if given, else next to the BSP.'
+    ))
+)
+parser.add_argument(
+    '--stream'
+    , action='store_true'
+    , help=str((
+        'Build info_node tile by tile and sort them through a temporary file, same output.'
+        , 'Lower peak memory on big maps, requires --merge cluster.'
+    ))
+)
+parser.add_argument(
+    '--output'
+    , type=str
+    , choices=tuple( OUTPUT_MODES )
+    , default=next( iter(OUTPUT_MODES) )
+    , help=str((
+        'ent = Write `.ent` next to the BSP.'
+        , 'bsp = Rewrite the entities lump of the BSP in place, other lumps copied as is.'
+        , f'Default "{next( iter(OUTPUT_MODES) )}"'
+    ))
+)
+parser.add_argument(
+    '--node-graph'
+    , action='store_true'
+    , help=str((
+        'Also write the node graph to graphs/<map>.nod next to the BSP, linked from nav connections.'
+        , f'The game then skips building it. At most {MAX_NODES} info_node, --output bsp only, not with --stream.'
+    ))
+)
+parser.add_argument(
+    '--max-nodes'
+    , type=int
+    , default=None
+    , help=str((
+        'Thin info_node down to this count, spread over the map, junctions & each place kept first.'
+        , 'Not with --stream. Default no limit.'
+    ))
+)
+parser.add_argument(
+    '--min-island'
+    , type=int
+    , default=0
+    , help=str((
+        'Leave out nav islands, areas connected to each other only, of less than this count of areas.'
+        , 'Default 0, all kept.'
+    ))
+)
+parser.add_argument(
+    '--spawn-reachable'
+    , action='store_true'
+    , help=str((
+        'Leave out nav islands without a player spawn of the BSP entities.'
+        , 'All kept if no spawn is on the nav mesh.'
+    ))
+)
+parser.add_argument(
+    '--stats'
+    , type=str
+    , choices=( "json", )
+    , default=None
+    , help=str((
+        'json = Print time of each stage & counters of each map, as a JSON line.'
+        , 'Default none.'
+    ))
+)
+parser.add_argument(
+    '--jobs', '-j'
+    , type=int
+    , default=None
+    , help='Worker process count for batch conversion. 0 = all cores. Default all cores.'
+)
+parser.add_argument(
+    '--tile-jobs'
+    , type=int
+    , default=1
+    , help=str((
+        'Worker process count to build the tiles of each map, same output.'
+        , '0 = all cores, shared with --jobs in batch. Default 1, built in the converting process.'
+    ))
 )
 
 
-infonode_total = 0
-with bsp_file.with_suffix(".ent").open( "w", encoding='ascii' ) as fp:
-    fp.writelines( iter_ent(load_entities(str(bsp_file))) )
-    print( "BSP Entities:", fp.tell(), "byte(s)" )
+def main (argv: list[str] = None):
+    args = parser.parse_args( argv )
+    for flag in args.order.lower():
+        if flag not in BUILD_FLAGS:
+            parser.error( f"Unknown flag {flag}" )
+    if args.stream and (args.merge != "cluster" or args.incremental):
+        parser.error( "--stream requires --merge cluster, without --incremental" )
+    if args.jobs is not None and args.jobs < 0:
+        parser.error( "--jobs must be 0 or more" )
+    if args.tile_jobs < 0:
+        parser.error( "--tile-jobs must be 0 or more" )
+    if args.tile_jobs != 1 and (args.stream or args.incremental):
+        parser.error( "--tile-jobs can not be used with --stream or --incremental" )
+    if args.node_graph and args.stream:
+        parser.error( "--node-graph can not be used with --stream" )
+    if args.node_graph and args.output != "bsp":
+        parser.error( "--node-graph requires --output bsp, the BSP must be older than its graph" )
+    if args.max_nodes is not None and args.max_nodes < 1:
+        parser.error( "--max-nodes must be 1 or more" )
+    if args.max_nodes is not None and args.stream:
+        parser.error( "--max-nodes can not be used with --stream" )
 
-    flags_clean = dict.fromkeys( args.order.lower(), None )
-    print( "info_node Build Order:" )
-    for flag in flags_clean:
-        txt = None
-        if flag == "a":
-            txt = 'Connections per area'
-        elif flag == "b":
-            txt = 'Encounter spots per area'
-        elif flag == "c":
-            txt = 'Inside of area, if area too small, 1 at the center'
+    # A single BSP keeps the verbose output.
+    if len(args.bsp_file) == 1 and args.bsp_file[0].is_file():
+        result = convert_map(
+            args.bsp_file[0], args.order, args.merge, print
+            , ent_parser=args.ent_parser
+            , nav_cache=args.nav_cache
+            , incremental=args.incremental
+            , stream=args.stream
+            , tile_jobs=args.tile_jobs
+            , stats=PipelineStats() if args.stats else None
+            , output=args.output
+            , node_graph=args.node_graph
+            , max_nodes=args.max_nodes
+            , min_island=args.min_island
+            , spawn_reachable=args.spawn_reachable
+        )
+        if args.stats:
+            print( json.dumps(result.to_dict()) )
+        return 0
+
+    bsp_files = list[pathlib.Path]()
+    failures = dict[pathlib.Path, str]()
+    for bsp_file, has_nav in iter_bsp_files( args.bsp_file ):
+        if has_nav:
+            bsp_files.append( bsp_file )
         else:
-            raise argparse.ArgumentError( "order", f"Unknown flag {flag}" )
-        print( '-', txt )
-    print()
+            failures[bsp_file] = "NAV file not found"
+    print( "BSP Total:", len(bsp_files) + len(failures) )
 
-    for ent in iter_navarea_ent( nav_areas, flags=args.order ):
-        print([
-            ent.get_id()
-            , ent.get_place()
-        ])
-        fp.write( str(ent) )
-        infonode_total += 1
+    converted_total = 0
+    infonode_total = 0
+    for bsp_file, result in iter_convert_batch(
+        bsp_files, args.order, args.merge, args.jobs
+        , ent_parser=args.ent_parser
+        , nav_cache=args.nav_cache
+        , incremental=args.incremental
+        , stream=args.stream
+        , tile_jobs=args.tile_jobs
+        , stats=bool( args.stats )
+        , output=args.output
+        , node_graph=args.node_graph
+        , max_nodes=args.max_nodes
+        , min_island=args.min_island
+        , spawn_reachable=args.spawn_reachable
+    ):
+        if isinstance( result, Exception ):
+            failures[bsp_file] = f"{type(result).__name__}: {result}"
+            continue
+        print(
+            f"{bsp_file}:"
+            , f"NAV Version {result.nav_version},"
+            , f"{result.nav_area_total} area(s),"
+            , f"{result.infonode_total} info_node(s)"
+        )
+        if args.stats:
+            print( json.dumps(result.to_dict()) )
+        converted_total += 1
+        infonode_total += result.infonode_total
+    for bsp_file, reason in failures.items():
+        print( f"{bsp_file}: FAILED, {reason}", file=sys.stderr )
 
     print(
-        f"info_node Total: {infonode_total}"
+        f"BSP Converted: {converted_total}"
+        , f"BSP Failed: {len(failures)}"
+        , f"info_node Total: {infonode_total}"
         , sep="\n"
     )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit( main() )
@@ -0,0 +1,202 @@
+"""Struct-of-arrays view of a loaded nav mesh.
+
+Requires NumPy, install `an_nav[numpy]`.
+"""
+from dataclasses import dataclass
+import numpy as np
+from .kaitai.nav import (
+    NavArea
+    , Place
+    , NUM_DIRECTIONS
+)
+
+
+
+NAV_CROUCH: int = 0x01
+"""Must crouch to use this node/area."""
+NAV_JUMP: int = 0x02
+"""Must jump to traverse this area."""
+NAV_PRECISE: int = 0x04
+"""Do not adjust for obstacles, just move along area."""
+NAV_NO_JUMP: int = 0x08
+"""Inhibit discontinuity jumping."""
+
+
+@dataclass( frozen=True, slots=True )
+class NavAreaArrays ():
+    """All `NavArea` fields laid out as contiguous arrays, one row per area.
+
+    Rows are in the same order as the area list they were built from.
+    Adjacency is stored CSR-style per direction: connections of area `i`
+    toward direction `d` are `adjacent_index[d][adjacent_offsets[d][i]:adjacent_offsets[d][i+1]]`,
+    given as row indices (`-1` if the connected ID does not exist).
+    """
+    ids: np.ndarray
+    """Area IDs, `uint32[n]`."""
+    lo: np.ndarray
+    """Extent lo corners, `float32[n,3]`."""
+    hi: np.ndarray
+    """Extent hi corners, `float32[n,3]`."""
+    corner_northeast_z: np.ndarray
+    """`float32[n]`."""
+    corner_southwest_z: np.ndarray
+    """`float32[n]`."""
+    attribute_flags: np.ndarray
+    """Raw `NAV_*` attribute bits, `uint8[n]`."""
+    place_ids: np.ndarray
+    """1-based index into `places`, 0 if undefined, `uint16[n]`."""
+    places: tuple[str, ...]
+    """Place names."""
+    adjacent_offsets: tuple[np.ndarray, ...]
+    """Per direction, `int64[n+1]`."""
+    adjacent_index: tuple[np.ndarray, ...]
+    """Per direction, `int32[m]`."""
+
+    @classmethod
+    def from_areas (cls, areas: list[NavArea], places: list[Place] = None):
+        n = len( areas )
+        ids = np.fromiter( (x.id for x in areas), dtype=np.uint32, count=n )
+        lo = np.array( [tuple(x.area_extent.lo) for x in areas], dtype=np.float32 ).reshape( n, 3 )
+        hi = np.array( [tuple(x.area_extent.hi) for x in areas], dtype=np.float32 ).reshape( n, 3 )
+        ne_z = np.fromiter( (x.corner_northeast_z for x in areas), dtype=np.float32, count=n )
+        sw_z = np.fromiter( (x.corner_southwest_z for x in areas), dtype=np.float32, count=n )
+        flags = np.fromiter( (x._raw_attribute_flags[0] for x in areas), dtype=np.uint8, count=n )
+        place_ids = np.fromiter( (getattr(x, "place_id", 0) for x in areas), dtype=np.uint16, count=n )
+
+        row_of = dict[int, int]( (int(v), k) for k,v in enumerate(ids) )
+        offsets = list[np.ndarray]()
+        index = list[np.ndarray]()
+        for d in range( NUM_DIRECTIONS ):
+            counts = np.fromiter(
+                (len(x.area_adjacents_per_directions[d].entries) for x in areas)
+                , dtype=np.int64
+                , count=n
+            )
+            offset = np.zeros( n + 1, dtype=np.int64 )
+            np.cumsum( counts, out=offset[1:] )
+            offsets.append( offset )
+            index.append( np.fromiter(
+                (
+                    row_of.get( c.area_id, -1 )
+                    for x in areas
+                    for c in x.area_adjacents_per_directions[d].entries
+                )
+                , dtype=np.int32
+                , count=int(offset[-1])
+            ) )
+        return cls(
+            ids
+            , lo
+            , hi
+            , ne_z
+            , sw_z
+            , flags
+            , place_ids
+            , tuple( str(x) for x in (places or ()) )
+            , tuple( offsets )
+            , tuple( index )
+        )
+
+    def __len__ (self) -> int:
+        return len( self.ids )
+
+    def index_of (self, ids: np.ndarray) -> np.ndarray:
+        """Row indices of the given area IDs, `-1` where not found."""
+        ids = np.asarray( ids, dtype=np.uint32 )
+        if not len(self.ids):
+            return np.full( ids.shape, -1, dtype=np.int64 )
+        order = np.argsort( self.ids, kind="stable" )
+        pos = np.searchsorted( self.ids, ids, sorter=order )
+        rows = order[np.minimum( pos, len(order) - 1 )]
+        return np.where( self.ids[rows] == ids, rows, -1 )
+
+    def delta (self) -> np.ndarray:
+        """Same as `Extent.ks_instances_delta` for every area, `float32[n,3]`."""
+        return self.hi - self.lo
+
+    def size (self) -> np.ndarray:
+        """Same as `Extent.ks_instances_size` for every area, `float64[n]`."""
+        delta = self.delta().astype( np.float64 )
+        return delta[:,0] * delta[:,1]
+
+    def center (self) -> np.ndarray:
+        """Same as `Extent.ks_instances_center` for every area, `float32[n,3]`."""
+        return (self.lo + self.hi) / np.float32( 2.0 )
+
+    def ignorable_mask (self) -> np.ndarray:
+        """Same as `utils.is_navarea_ignorable` for every area, `bool[n]`."""
+        flags = self.attribute_flags
+        return ((flags & NAV_PRECISE) == 0) & ((flags & (NAV_CROUCH | NAV_JUMP)) != 0)
+
+    def is_overlapping (self, rows: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Same as `NavArea.IsOverlapping` for each (row, x, y), `bool[k]`."""
+        lo = self.lo[rows].astype( np.float64 )
+        hi = self.hi[rows].astype( np.float64 )
+        return (
+            (x >= lo[:,0]) & (x <= hi[:,0])
+            & (y >= lo[:,1]) & (y <= hi[:,1])
+        )
+
+    def get_z (self, rows: np.ndarray, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """Same as `NavArea.GetZ` for each (row, x, y), `float64[k]`.
+
+        Computed in double precision like the scalar version, results are equal.
+        """
+        lo = self.lo[rows].astype( np.float64 )
+        hi = self.hi[rows].astype( np.float64 )
+        ne_z = self.corner_northeast_z[rows].astype( np.float64 )
+        sw_z = self.corner_southwest_z[rows].astype( np.float64 )
+        dx = hi[:,0] - lo[:,0]
+        dy = hi[:,1] - lo[:,1]
+        # guard against division by zero due to degenerate areas.
+        degenerate = (dx == 0.0) | (dy == 0.0)
+        with np.errstate( divide="ignore", invalid="ignore" ):
+            u = np.clip( (x - lo[:,0]) / dx, 0.0, 1.0 )
+            v = np.clip( (y - lo[:,1]) / dy, 0.0, 1.0 )
+        north_z = lo[:,2] + u * (ne_z - lo[:,2])
+        south_z = sw_z + u * (hi[:,2] - sw_z)
+        return np.where( degenerate, ne_z, north_z + v * (south_z - north_z) )
+
+    def sample_inside (self, cell_size: float, offset_z: float):
+        """Batched `utils.iter_navarea_ent_inside` over every area.
+
+        Return `(offsets, origins)`, origins of area `i` are
+        `origins[offsets[i]:offsets[i+1]]` as `float64[k,3]`,
+        in the same order and with the same values as the scalar version.
+        """
+        n = len( self )
+        lo = self.lo.astype( np.float64 )
+        center = self.center().astype( np.float64 )
+        delta = self.delta().astype( np.float64 )
+        count_x = np.maximum( 1, np.trunc(delta[:,0] / cell_size) ).astype( np.int64 )
+        count_y = np.maximum( 1, np.trunc(delta[:,1] / cell_size) ).astype( np.int64 )
+        counts = count_x * count_y
+        offsets = np.zeros( n + 1, dtype=np.int64 )
+        np.cumsum( counts, out=offsets[1:] )
+
+        # One row per candidate, `x` major and `y` minor.
+        rows = np.repeat( np.arange(n), counts )
+        k = np.arange( offsets[-1] ) - offsets[rows]
+        cx = count_x[rows]
+        cy = count_y[rows]
+        xi = k // cy
+        yi = k % cy
+        add_x = delta[rows,0] / cx
+        add_y = delta[rows,1] / cy
+        x = np.where( cx > 1, lo[rows,0] + add_x * (xi + 1), center[rows,0] )
+        y = np.where( cy > 1, lo[rows,1] + add_y * (yi + 1), center[rows,1] )
+        ok = self.is_overlapping( rows, x, y )
+        z = self.get_z( rows, x, y ) + offset_z
+
+        # Too small areas, 1 at the center.
+        single = ((cx == 1) & (cy == 1))
+        origins = np.stack( (
+            np.where( single, center[rows,0], x.astype(np.float32) )
+            , np.where( single, center[rows,1], y.astype(np.float32) )
+            , np.where( single, center[rows,2] + offset_z, z )
+        ), axis=1 )
+        ok |= single
+
+        counts = np.bincount( rows[ok], minlength=n )
+        np.cumsum( counts, out=offsets[1:] )
+        return (offsets, origins[ok])
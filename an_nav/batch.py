@@ -0,0 +1,308 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import ExitStack
+from dataclasses import dataclass
+from glob import glob, has_magic
+import io
+import os
+import pathlib
+from typing import Callable
+from warnings import warn
+from .graph import MAX_NODES, node_graph_path, write_node_graph
+from .kaitai.bsp import write_entities_lump
+from .incremental import build_navarea_ent_incremental, incremental_state_path
+from .lark.ent import iter_ent
+from .parallel import build_navarea_ent_parallel
+from .stats import PipelineStats, stage
+from .stream import NodeSpill, iter_navarea_ent_tiles
+from .thin import thin_nodes
+from .utils import (
+    load_navmesh
+    , load_entities
+    , Nav2EntSession
+    , MERGE_ENGINES
+    , find_navarea_islands
+    , iter_spawn_origins
+)
+
+
+
+BUILD_FLAGS = dict[str, str](
+    a='Connections per area'
+    , b='Encounter spots per area'
+    , c='Inside of area, if area too small, 1 at the center'
+)
+"""Build flag -> description."""
+OUTPUT_MODES = dict[str, str](
+    ent='`.ent` file next to the BSP'
+    , bsp='BSP rewritten with the new entities lump'
+)
+"""Output mode -> description."""
+
+
+@dataclass( frozen=True, slots=True )
+class ConvertResult ():
+    """Summary of one converted map."""
+    bsp_file: pathlib.Path
+    nav_version: int
+    nav_area_total: int
+    entities_size: int
+    """Size of the BSP entities written, in byte(s)."""
+    infonode_total: int
+    stats: PipelineStats | None = None
+
+    def to_dict (self) -> dict:
+        """Plain values, for JSON."""
+        return dict(
+            bsp_file=str( self.bsp_file )
+            , nav_version=self.nav_version
+            , nav_area_total=self.nav_area_total
+            , entities_size=self.entities_size
+            , infonode_total=self.infonode_total
+            , **(self.stats.to_dict() if self.stats else {})
+        )
+
+
+def convert_map (
+    bsp_file: pathlib.Path
+    , order: str = "c"
+    , merge: str = MERGE_ENGINES[0]
+    , log: Callable[..., None] | None = None
+    , *
+    , ent_parser: str = None
+    , nav_cache: str = None
+    , incremental: bool = False
+    , stream: bool = False
+    , tile_jobs: int = 1
+    , stats: PipelineStats | None = None
+    , output: str = "ent"
+    , node_graph: bool = False
+    , max_nodes: int | None = None
+    , min_island: int = 0
+    , spawn_reachable: bool = False
+) -> ConvertResult:
+    """Write `.ent` of a BSP, with `info_node`s built from its sibling `.NAV`.
+
+    `log` is called like `print` for the progress, silent if None.
+    `ent_parser` is one of `lark.ent.ENT_PARSERS`, to read the BSP entities.
+    `nav_cache` is a directory for `.NAV` snapshots, see `utils.load_navmesh`.
+    `incremental` reuses the previous run of the map for unchanged areas,
+    its state is kept in `nav_cache` if given, else next to the BSP.
+    `stream` builds tile by tile and sorts through a temporary file, "cluster" merge only.
+    `tile_jobs` other than 1 builds tiles over that many worker(s), 0 for all cores.
+    `stats` is filled with the time of each stage & counters, returned in the result.
+    `output` is one of `OUTPUT_MODES`, "bsp" replaces the BSP once written,
+    its old `info_node`s are dropped as for `.ent`.
+    `node_graph` also writes the `.nod` of the `info_node`s, see `graph.node_graph_path`,
+    skipped with a warning past `graph.MAX_NODES`. Output "bsp" only, not with `stream`.
+    `max_nodes` thins the `info_node`s down to it, see `thin.thin_nodes`. Not with `stream`.
+    `min_island` & `spawn_reachable` leave out nav islands smaller than it or without
+    a spawn of the BSP entities, see `utils.find_navarea_islands`.
+    """
+    log = log or (lambda *args, **kwargs: None)
+    bsp_file = pathlib.Path( bsp_file )
+    flags_clean = dict.fromkeys( order.lower(), None )
+    for flag in flags_clean:
+        if flag not in BUILD_FLAGS:
+            raise ValueError( f"Unknown flag {flag}" )
+    if stream and (merge != "cluster" or incremental):
+        raise ValueError( "Streaming requires the cluster merge engine, without incremental" )
+    if tile_jobs < 0:
+        raise ValueError( f"Tile worker count must be 0 or more, got {tile_jobs}" )
+    if tile_jobs != 1 and (stream or incremental):
+        raise ValueError( "Parallel tiles can not be used with streaming or incremental" )
+    if output not in OUTPUT_MODES:
+        raise ValueError( f"Unknown output {output}" )
+    if node_graph and stream:
+        raise ValueError( "Node graph can not be built while streaming" )
+    if node_graph and output != "bsp":
+        # The `.ent` is put in the BSP afterwards, that makes the graph older.
+        raise ValueError( "Node graph requires the bsp output" )
+    if max_nodes is not None and max_nodes < 1:
+        raise ValueError( f"Node budget must be 1 or more, got {max_nodes}" )
+    if max_nodes is not None and stream:
+        raise ValueError( "Node budget can not be enforced while streaming" )
+
+    nav_mesh = load_navmesh( str(bsp_file.with_suffix(".nav")), order, nav_cache, stats )
+    nav_version = nav_mesh.version
+    nav_areas = nav_mesh.nav_areas.entries
+    log(
+        f"NAV Version: {nav_version}"
+        , f"NAV Area Count: {len(nav_areas)}"
+        , sep="\n"
+    )
+
+    infonode_total = 0
+    infonodes = None
+    with ExitStack() as stack:
+        if output == "bsp":
+            fp = stack.enter_context( io.StringIO() )
+        else:
+            fp = stack.enter_context( bsp_file.with_suffix(".ent").open("w", encoding='ascii') )
+        with stage( stats, "entities.parse" ):
+            entities = load_entities( str(bsp_file), ent_parser )
+        fp.writelines( iter_ent(entities) )
+        entities_size = fp.tell()
+        log( "BSP Entities:", entities_size, "byte(s)" )
+
+        log( "info_node Build Order:" )
+        for flag in flags_clean:
+            log( '-', BUILD_FLAGS[flag] )
+        log()
+
+        session = Nav2EntSession( nav_mesh, stats )
+        if min_island > 1 or spawn_reachable:
+            with stage( stats, "prune" ):
+                spawns = list( iter_spawn_origins(entities) ) if spawn_reachable else None
+                session.excluded = find_navarea_islands( nav_mesh, min_island, spawns )
+            if stats is not None:
+                stats.count( "pruned_areas", len(session.excluded) )
+            log( f"NAV Area Pruned: {len(session.excluded)}" )
+        if stream:
+            spill = stack.enter_context( NodeSpill() )
+            with stage( stats, "build" ):
+                for done in iter_navarea_ent_tiles( session, order ):
+                    spill.add_run([
+                        (key, ent.get_id(), str(ent))
+                        for key, ent in done
+                    ])
+            nodes = ((ent_id, place, block) for (place, *_), ent_id, block in spill)
+        else:
+            if tile_jobs != 1:
+                with stage( stats, "build" ):
+                    nodes = build_navarea_ent_parallel(
+                        session, str(bsp_file.with_suffix(".nav")), order, merge, tile_jobs or None, nav_cache
+                    )
+            elif incremental:
+                with stage( stats, "build" ):
+                    nodes, reused, total = build_navarea_ent_incremental(
+                        session, incremental_state_path(bsp_file, nav_cache), order, merge
+                    )
+                log( f"info_node Reused: {reused}/{total} area build(s)" )
+            else:
+                nodes = list( session.iter_navarea_ent(flags=order, merge=merge) )
+            if max_nodes is not None:
+                with stage( stats, "thin" ):
+                    thinned = thin_nodes( nodes, max_nodes )
+                if stats is not None:
+                    stats.count( "thinned", len(nodes) - len(thinned) )
+                log( f"info_node Thinned: {len(nodes) - len(thinned)}" )
+                nodes = thinned
+            infonodes = nodes
+            nodes = ((ent.get_id(), ent.get_place(), str(ent)) for ent in nodes)
+        with stage( stats, "write" ):
+            for ent_id, place, block in nodes:
+                log([
+                    ent_id
+                    , place
+                ])
+                fp.write( block )
+                infonode_total += 1
+            if output == "bsp":
+                bsp_size = write_entities_lump( str(bsp_file), str(bsp_file), fp.getvalue() )
+
+        log(
+            f"info_node Total: {infonode_total}"
+            , sep="\n"
+        )
+        if output == "bsp":
+            log( "BSP Written:", bsp_size, "byte(s)" )
+
+    if node_graph and infonode_total > MAX_NODES:
+        warn( f"{bsp_file}: node graph skipped, {infonode_total} info_node(s) over {MAX_NODES}", RuntimeWarning )
+    elif node_graph:
+        with stage( stats, "graph" ):
+            graph = write_node_graph( infonodes, node_graph_path(bsp_file), bsp_file )
+        log(
+            f"Node Graph Links: {len(graph.links)}"
+            , f"Node Graph Links Rejected: {graph.rejected}"
+            , sep="\n"
+        )
+    return ConvertResult(
+        bsp_file
+        , nav_version
+        , len( nav_areas )
+        , entities_size
+        , infonode_total
+        , stats
+    )
+
+
+def iter_bsp_files (paths: list[str | pathlib.Path]):
+    """Yield `(bsp_file, has_nav)` found in the given files, directories or globs.
+
+    Directories are searched for `*.bsp` directly inside of them.
+    Each BSP is yielded once, in the given order.
+    """
+    found = dict[pathlib.Path, None]()
+    for path in paths:
+        path = str( path )
+        if has_magic( path ):
+            subpaths = sorted( pathlib.Path(x) for x in glob(path) )
+        elif pathlib.Path( path ).is_dir():
+            subpaths = sorted( pathlib.Path(path).glob("*.bsp") )
+        else:
+            subpaths = [pathlib.Path( path )]
+        for subpath in subpaths:
+            if subpath.is_dir() or subpath.suffix.lower() != ".bsp":
+                continue
+            found[subpath] = None
+    for bsp_file in found:
+        yield (bsp_file, bsp_file.with_suffix(".nav").is_file())
+
+
+def iter_convert_batch (
+    bsp_files: list[pathlib.Path]
+    , order: str = "c"
+    , merge: str = MERGE_ENGINES[0]
+    , jobs: int | None = None
+    , *
+    , ent_parser: str = None
+    , nav_cache: str = None
+    , incremental: bool = False
+    , stream: bool = False
+    , tile_jobs: int = 1
+    , stats: bool = False
+    , output: str = "ent"
+    , node_graph: bool = False
+    , max_nodes: int | None = None
+    , min_island: int = 0
+    , spawn_reachable: bool = False
+):
+    """Convert maps over a process pool of `jobs` worker(s), all cores if None or 0.
+
+    Yield `(bsp_file, result)` as each map is done,
+    `result` is a `ConvertResult`, or the exception that stopped the map.
+    `stats` fills `ConvertResult.stats` of each map.
+    `tile_jobs` is capped to the cores left to each of the `jobs` worker(s), 0 for all of them.
+    """
+    if jobs is not None and jobs < 0:
+        raise ValueError( f"Worker count must be 0 or more, got {jobs}" )
+    jobs = jobs or None
+    cores = os.cpu_count() or 1
+    if tile_jobs != 1 and bsp_files:
+        # Each map worker starts its own pool, not one of all cores each.
+        tile_jobs = min( tile_jobs or cores, max(1, cores // min( jobs or cores, len(bsp_files) )) )
+    with ProcessPoolExecutor( max_workers=jobs ) as pool:
+        futures = {
+            pool.submit(
+                convert_map, bsp_file, order, merge, None
+                , ent_parser=ent_parser
+                , nav_cache=nav_cache
+                , incremental=incremental
+                , stream=stream
+                , tile_jobs=tile_jobs
+                , stats=PipelineStats() if stats else None
+                , output=output
+                , node_graph=node_graph
+                , max_nodes=max_nodes
+                , min_island=min_island
+                , spawn_reachable=spawn_reachable
+            ): bsp_file
+            for bsp_file in bsp_files
+        }
+        for future in as_completed( futures ):
+            bsp_file = futures[future]
+            try:
+                yield (bsp_file, future.result())
+            except Exception as e:
+                yield (bsp_file, e)
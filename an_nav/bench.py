@@ -0,0 +1,155 @@
+"""Benchmarks over synthetic maps, see `synth`.
+
+Results are written as JSON, along with the commit & platform they ran on,
+to be compared with the results of another commit.
+"""
+import argparse
+from dataclasses import asdict, replace
+import json
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable
+from .synth import SynthParams, write_map
+from .utils import load_navarea, load_entities, iter_navarea_ent
+
+
+
+BENCH_SIZES = ( 100, 1000, 10000, 50000 )
+"""Default area counts."""
+BENCH_FLAGS = ( "a", "b", "c" )
+"""Build flags timed one by one."""
+BENCH_CLI_FLAGS = "abc"
+
+
+def _best_of (repeat: int, func: Callable[[], object]) -> float:
+    """Lowest wall time of `repeat` call(s), in second(s)."""
+    best = float( "inf" )
+    for _ in range( repeat ):
+        start = time.perf_counter()
+        func()
+        best = min( best, time.perf_counter() - start )
+    return best
+
+
+def bench_map (bsp_file: pathlib.Path, repeat: int = 3, cli: bool = True) -> dict[str, float]:
+    """Time each step of converting one map, `name -> second(s)`."""
+    nav_file = str( bsp_file.with_suffix(".nav") )
+    results = dict[str, float]()
+    results["load_navarea"] = _best_of( repeat, lambda: load_navarea(nav_file) )
+    results["load_entities"] = _best_of( repeat, lambda: load_entities(str( bsp_file )) )
+    _, areas = load_navarea( nav_file )
+    for flag in BENCH_FLAGS:
+        # Build marks are kept in the session, a new one each run.
+        results[f"iter_navarea_ent.{flag}"] = _best_of(
+            repeat
+            , lambda: list( iter_navarea_ent(areas, flag) )
+        )
+    if cli:
+        command = [sys.executable, "-m", __package__, str( bsp_file ), "-f", BENCH_CLI_FLAGS]
+        results["cli"] = _best_of(
+            repeat
+            , lambda: subprocess.run( command, check=True, stdout=subprocess.DEVNULL )
+        )
+    return results
+
+
+def run_benchmarks (
+    sizes: list[int] = BENCH_SIZES
+    , repeat: int = 3
+    , cli: bool = True
+    , params: SynthParams = SynthParams()
+    , log: Callable[..., None] | None = None
+) -> dict:
+    """Benchmark a synthetic map of each size, built from `params`."""
+    log = log or (lambda *args, **kwargs: None)
+    results = dict[str, dict[str, float]]()
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            bsp_file = write_map( pathlib.Path(tmp, f"synth_{size}"), replace(params, areas=size) )
+            log( f"{size} area(s)..." )
+            results[str( size )] = bench_map( bsp_file, repeat, cli )
+    return dict(
+        commit=_git_commit()
+        , python=platform.python_version()
+        , platform=platform.platform()
+        , repeat=repeat
+        , params={k: v for k, v in asdict( params ).items() if k != "areas"}
+        , results=results
+    )
+
+
+def _git_commit () -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"]
+            , cwd=pathlib.Path( __file__ ).parent
+            , check=True
+            , capture_output=True
+            , text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def iter_compare (new: dict, old: dict):
+    """Yield `(size, name, new second(s), old second(s))` timed in both."""
+    for size, timings in new["results"].items():
+        old_timings = old["results"].get( size, {} )
+        for name, seconds in timings.items():
+            if name in old_timings:
+                yield (size, name, seconds, old_timings[name])
+
+
+def main (argv: list[str] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m an_nav.bench'
+        , description='Time the conversion steps over synthetic maps.'
+    )
+    parser.add_argument(
+        '--sizes'
+        , type=int
+        , nargs='+'
+        , default=list( BENCH_SIZES )
+        , help=f'Area counts. Default {" ".join( map(str, BENCH_SIZES) )}.'
+    )
+    parser.add_argument( '--version', type=int, default=5, help='`.NAV` version. Default 5.' )
+    parser.add_argument( '--seed', type=int, default=0, help='Default 0.' )
+    parser.add_argument( '--repeat', '-r', type=int, default=3, help='Runs of each step, the best is kept. Default 3.' )
+    parser.add_argument( '--no-cli', action='store_true', help='Skip the end-to-end CLI runs.' )
+    parser.add_argument( '--output', '-o', type=pathlib.Path, default=None, help='JSON file of the results.' )
+    parser.add_argument(
+        '--compare'
+        , type=pathlib.Path
+        , default=None
+        , help='JSON file of previous results, prints new / old time ratios.'
+    )
+    args = parser.parse_args( argv )
+
+    report = run_benchmarks(
+        args.sizes
+        , args.repeat
+        , not args.no_cli
+        , SynthParams( version=args.version, seed=args.seed )
+        , lambda *x: print( *x, file=sys.stderr )
+    )
+    text = json.dumps( report, indent=2 )
+    if args.output is None:
+        print( text )
+    else:
+        args.output.write_text( text + "\n", encoding="utf-8" )
+
+    if args.compare is not None:
+        old = json.loads( args.compare.read_text(encoding="utf-8") )
+        print( f"{'areas':>8} {'step':<22} {'new':>10} {'old':>10} {'ratio':>7}" )
+        for size, name, seconds, old_seconds in iter_compare( report, old ):
+            ratio = seconds / old_seconds if old_seconds else float( "inf" )
+            print( f"{size:>8} {name:<22} {seconds:>10.4f} {old_seconds:>10.4f} {ratio:>7.2f}" )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit( main() )
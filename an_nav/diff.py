@@ -0,0 +1,337 @@
+"""Differential tests of the optimized pipelines against the reference one.
+
+The reference reads entities with the Lark grammar, parses the whole `.NAV`
+without snapshot and builds `info_node`s within a single session, without NumPy,
+merging through a linear scan of the nodes like the original code did.
+Each variant swaps one part of it for a fast path, its output must be the same.
+"""
+import argparse
+from dataclasses import dataclass
+import pathlib
+import sys
+import tempfile
+from typing import Callable
+from .batch import iter_bsp_files
+from .incremental import build_navarea_ent_incremental, incremental_state_path
+from .parallel import build_navarea_ent_parallel
+from .stream import NodeSpill, iter_navarea_ent_tiles
+from .synth import SynthParams, NAV_VERSIONS, write_map
+from .kaitai.nav import NavMesh, Vector
+from .utils import (
+    InfoNodeEntity
+    , InfoNodeIndex
+    , Nav2EntSession
+    , MERGE_ENGINES
+    , load_navmesh
+    , load_entities
+)
+
+
+
+NODE_FIELDS = ( "origin", "netname", "message", "sequence", "noise" )
+"""`info_node` keys compared, in `InfoNodeEntity.__str__` order."""
+
+NodeRecord = dict[str, str]
+"""`NODE_FIELDS` of an `info_node`, merged IDs sorted."""
+
+
+def node_record (ent: InfoNodeEntity) -> NodeRecord:
+    """`NODE_FIELDS` of the node, as written in `.ent`.
+
+    Merged names are joined from a set, they are sorted to not depend on its order.
+    """
+    direction = ent.get_direction()
+    return dict(
+        origin=ent.origin.keyvalue
+        , netname=f"nav2ent_{ent.get_name()}"
+        , message=ent.get_place()
+        , sequence=str( direction.value ) if direction else ""
+        , noise=";".join( sorted(set( x.get_name() for x in ent.merged_nodes )) )
+    )
+
+
+@dataclass( frozen=True, slots=True )
+class Divergence ():
+    """First difference between the reference & a variant."""
+    variant: str
+    kind: str
+    """"entity" or "info_node"."""
+    index: int
+    """Position of the block in the output."""
+    key: str
+    """Key of the block that differs, "count" if one output is shorter."""
+    expected: str | None
+    actual: str | None
+
+    def __str__ (self) -> str:
+        return (
+            f"{self.variant}: {self.kind} #{self.index} {self.key}:"
+            f" expected {self.expected!r}, got {self.actual!r}"
+        )
+
+
+def find_divergence (
+    variant: str
+    , kind: str
+    , expected: list[dict[str, str]]
+    , actual: list[dict[str, str]]
+) -> Divergence | None:
+    """First differing block of two outputs, None if they are the same."""
+    for index, (a, b) in enumerate( zip(expected, actual) ):
+        if a == b:
+            continue
+        for key in dict.fromkeys( [*a, *b] ):
+            if a.get( key ) != b.get( key ):
+                return Divergence( variant, kind, index, key, a.get(key), b.get(key) )
+    if len(expected) != len(actual):
+        index = min( len(expected), len(actual) )
+        return Divergence( variant, kind, index, "count", str(len( expected )), str(len( actual )) )
+    return None
+
+
+class LinearNodeIndex (dict[InfoNodeEntity, None]):
+    """`InfoNodeIndex` without its grid, every lookup scans all nodes in insertion order."""
+    def __init__ (self):
+        super().__init__()
+        self.intersect_tests: int = 0
+
+    def find_intersects (self, ent: InfoNodeEntity) -> InfoNodeEntity|None:
+        for node in self:
+            if node is ent:
+                continue
+            self.intersect_tests += 1
+            if node.is_intersects( ent ):
+                return node
+        return None
+
+    def find_contains (self, origin: Vector) -> InfoNodeEntity|None:
+        for node in self:
+            if node.is_inside_of_me( origin ):
+                return node
+        return None
+
+
+DIFF_EDIT_STEP = 7
+"""Every that many area is edited before the partial incremental run."""
+DIFF_EDIT_Z = 16.0
+
+
+class DiffContext ():
+    """One map to convert, shared by the reference & variants."""
+    def __init__ (self, bsp_file: pathlib.Path, flags: str, merge: str, work_dir: str):
+        self.bsp_file = bsp_file
+        self.nav_file = str( bsp_file.with_suffix(".nav") )
+        self.flags = flags
+        self.merge = merge
+        self.work_dir = work_dir
+        """Scratch directory, for snapshots & states."""
+
+    def session (self, cache_dir: str = None, lazy: bool = True, index: bool = True) -> Nav2EntSession:
+        """A new session over a newly loaded mesh.
+
+        `lazy` leaves the sections the flags do not need unparsed,
+        `index` merges through `InfoNodeIndex` instead of `LinearNodeIndex`.
+        """
+        mesh = load_navmesh( self.nav_file, self.flags if lazy else None, cache_dir )
+        session = Nav2EntSession( mesh )
+        session.nodes = InfoNodeIndex() if index else LinearNodeIndex()
+        return session
+
+
+def edit_navmesh (mesh: NavMesh, step: int = DIFF_EDIT_STEP, z: float = DIFF_EDIT_Z):
+    """Raise every `step`th area of the mesh by `z`, along with its encounter paths, in place."""
+    for area in mesh.nav_areas.entries[::step]:
+        ext = area.area_extent
+        ext.lo.z += z
+        ext.hi.z += z
+        area.corner_northeast_z += z
+        area.corner_southwest_z += z
+        if not area.encounter_spots.ks_instances_is_legacy:
+            for spot in area.encounter_spots.entries:
+                spot.path.source.z += z
+                spot.path.target.z += z
+
+
+Pipeline = Callable[[DiffContext], tuple[list[dict[str, str]] | None, list[NodeRecord] | None]]
+"""Entity blocks & `info_node`s of a map, None for parts it does not cover."""
+
+
+def _reference (ctx: DiffContext):
+    entities = load_entities( str(ctx.bsp_file), "lark" )
+    session = ctx.session( lazy=False, index=False )
+    nodes = session.iter_navarea_ent( flags=ctx.flags, batched=False, merge=ctx.merge )
+    return (entities, [node_record( x ) for x in nodes])
+
+
+def _variant_scanner (ctx: DiffContext):
+    return (load_entities( str(ctx.bsp_file), "scanner" ), None)
+
+
+def _variant_index (ctx: DiffContext):
+    nodes = ctx.session( lazy=False ).iter_navarea_ent( flags=ctx.flags, batched=False, merge=ctx.merge )
+    return (None, [node_record( x ) for x in nodes])
+
+
+def _variant_lazy (ctx: DiffContext):
+    nodes = ctx.session( index=False ).iter_navarea_ent( flags=ctx.flags, batched=False, merge=ctx.merge )
+    return (None, [node_record( x ) for x in nodes])
+
+
+def _variant_batched (ctx: DiffContext):
+    nodes = ctx.session().iter_navarea_ent( flags=ctx.flags, batched=True, merge=ctx.merge )
+    return (None, [node_record( x ) for x in nodes])
+
+
+def _variant_nav_cache (ctx: DiffContext):
+    cache_dir = str( pathlib.Path(ctx.work_dir, "nav-cache") )
+    # The 1st load writes the snapshot, the 2nd reads it.
+    ctx.session( cache_dir )
+    nodes = ctx.session( cache_dir ).iter_navarea_ent( flags=ctx.flags, batched=False, merge=ctx.merge )
+    return (None, [node_record( x ) for x in nodes])
+
+
+def _variant_incremental (ctx: DiffContext):
+    state_path = incremental_state_path( ctx.bsp_file, ctx.work_dir )
+    state_path.unlink( missing_ok=True )
+    # The 1st run builds everything, the 2nd reuses all of it.
+    build_navarea_ent_incremental( ctx.session(), state_path, ctx.flags, ctx.merge )
+    nodes, _, _ = build_navarea_ent_incremental( ctx.session(), state_path, ctx.flags, ctx.merge )
+    return (None, [node_record( x ) for x in nodes])
+
+
+def _variant_incremental_edit (ctx: DiffContext):
+    state_path = incremental_state_path( ctx.bsp_file, ctx.work_dir )
+    state_path.unlink( missing_ok=True )
+    # The 1st run is of edited areas, the 2nd rebuilds them & reuses the others.
+    session = ctx.session()
+    edit_navmesh( session.mesh )
+    build_navarea_ent_incremental( session, state_path, ctx.flags, ctx.merge )
+    nodes, _, _ = build_navarea_ent_incremental( ctx.session(), state_path, ctx.flags, ctx.merge )
+    return (None, [node_record( x ) for x in nodes])
+
+
+def _variant_stream (ctx: DiffContext):
+    if ctx.merge != "cluster":
+        return (None, None)
+    with NodeSpill( ctx.work_dir ) as spill:
+        for done in iter_navarea_ent_tiles( ctx.session(), ctx.flags ):
+            spill.add_run( [(key, node_record( ent )) for key, ent in done] )
+        return (None, [record for _, record in spill])
+
+
+def _variant_tiles (ctx: DiffContext):
+    nodes = build_navarea_ent_parallel( ctx.session(), ctx.nav_file, ctx.flags, ctx.merge, jobs=2 )
+    return (None, [node_record( x ) for x in nodes])
+
+
+DIFF_VARIANTS = dict[str, Pipeline](
+    scanner=_variant_scanner
+    , index=_variant_index
+    , lazy=_variant_lazy
+    , batched=_variant_batched
+    , nav_cache=_variant_nav_cache
+    , incremental=_variant_incremental
+    , incremental_edit=_variant_incremental_edit
+    , stream=_variant_stream
+    , tiles=_variant_tiles
+)
+"""Variant name -> pipeline, compared with the reference.
+
+The "cluster" merge is not one of them, it may merge more by design, see `merge_node_clusters`.
+"""
+DIFF_FLAGS = ( "a", "b", "c", "abc" )
+"""Build flags compared by default, each alone so the sections they skip are checked too."""
+
+
+def iter_diff_map (
+    bsp_file: pathlib.Path
+    , flags: str = "abc"
+    , merge: str = MERGE_ENGINES[0]
+    , variants: list[str] = tuple( DIFF_VARIANTS )
+):
+    """Yield `(variant, divergence or None)` for each variant that covers the map & merge."""
+    with tempfile.TemporaryDirectory() as work_dir:
+        ctx = DiffContext( pathlib.Path(bsp_file), flags, merge, work_dir )
+        entities, nodes = _reference( ctx )
+        for variant in variants:
+            actual_entities, actual_nodes = DIFF_VARIANTS[variant]( ctx )
+            if actual_entities is None and actual_nodes is None:
+                continue
+            divergence = None
+            if actual_entities is not None:
+                divergence = find_divergence( variant, "entity", entities, actual_entities )
+            if divergence is None and actual_nodes is not None:
+                divergence = find_divergence( variant, "info_node", nodes, actual_nodes )
+            yield (variant, divergence)
+
+
+def main (argv: list[str] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m an_nav.diff'
+        , description='Compare the output of optimized pipelines with the reference one.'
+    )
+    parser.add_argument(
+        'bsp_file'
+        , type=pathlib.Path
+        , nargs='*'
+        , help='BSP files, directories or globs, their NAV next to them.'
+    )
+    parser.add_argument(
+        '--synth'
+        , type=int
+        , nargs='+'
+        , default=[]
+        , help='Also compare synthetic maps of these area counts, one per NAV version.'
+    )
+    parser.add_argument( '--seed', type=int, default=0, help='Seed of synthetic maps. Default 0.' )
+    parser.add_argument(
+        '--build-flag', '-f'
+        , type=str
+        , dest="order"
+        , nargs='+'
+        , default=list( DIFF_FLAGS )
+        , help=f'Build flags, each compared apart. Default {" ".join( DIFF_FLAGS )}.'
+    )
+    parser.add_argument(
+        '--merge'
+        , type=str
+        , choices=MERGE_ENGINES
+        , nargs='+'
+        , default=list( MERGE_ENGINES )
+        , help='Merge engines of the reference. Default all.'
+    )
+    parser.add_argument(
+        '--variant'
+        , type=str
+        , choices=tuple( DIFF_VARIANTS )
+        , nargs='+'
+        , default=list( DIFF_VARIANTS )
+        , help='Default all.'
+    )
+    args = parser.parse_args( argv )
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as synth_dir:
+        bsp_files = [x for x, has_nav in iter_bsp_files( args.bsp_file ) if has_nav]
+        for areas in args.synth:
+            for version in NAV_VERSIONS:
+                bsp_files.append( write_map(
+                    pathlib.Path( synth_dir, f"synth_{areas}_v{version}" )
+                    , SynthParams( areas=areas, version=version, seed=args.seed )
+                ) )
+        if not bsp_files:
+            parser.error( "No map to compare" )
+        for bsp_file in bsp_files:
+            for flags, merge in ((x, y) for x in args.order for y in args.merge):
+                for variant, divergence in iter_diff_map( bsp_file, flags, merge, args.variant ):
+                    if divergence is None:
+                        print( f"{bsp_file.name} [-f {flags} {merge}] {variant}: OK" )
+                        continue
+                    failures += 1
+                    print( f"{bsp_file.name} [-f {flags} {merge}] {divergence}", file=sys.stderr )
+    print( f"Divergence(s): {failures}" )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit( main() )
@@ -0,0 +1,503 @@
+"""Half-Life node graph (`.nod`), prebuilt from `info_node`s & nav connectivity.
+
+The file layout is `CGraph::FSaveGraph` of HLSDK `nodes.cpp`, `GRAPH_VERSION` 16,
+as written by the 32-bit game libraries. The game loads it instead of tracing
+between every node pair, as long as it is newer than the BSP.
+
+Links join nodes of the same area, and nodes of areas connected in the `.NAV`.
+Routes are the shortest paths over them, compressed like `ComputeStaticRoutingTables`.
+"""
+from dataclasses import dataclass
+from enum import IntEnum, IntFlag
+from heapq import heappush, heappop
+from math import sqrt
+import os
+import pathlib
+from struct import Struct
+from zlib import crc32
+from .kaitai.nav import NavArea
+from .utils import InfoNodeEntity
+
+
+
+GRAPH_VERSION = 16
+MAX_NODES = 1024
+"""Highest node count the game handles."""
+MAX_NODE_HULLS = 4
+MAX_NODE_INITIAL_LINKS = 128
+"""Highest link count of a node, the nearest ones are kept."""
+NODE_HEIGHT = 8
+"""Land nodes are this high above the floor."""
+NUM_RANGES = 256
+CACHE_SIZE = 128
+ENTRY_STATE_EMPTY = -1
+NODE_INLINE_DOT = 0.998
+"""Links this close in direction to a shorter one are rejected, see `RejectInlineLinks`."""
+LARGE_HULL_WIDTH = 64.0
+"""Width of the large hull, areas & portals narrower than it do not link it."""
+MAX_ROUTE_JUMP = 127
+"""Highest distance between the indices of linked nodes, routes store it in a signed byte.
+
+Offsets go from `-MAX_ROUTE_JUMP - 1` to `MAX_ROUTE_JUMP`, wrapping around the node count.
+"""
+_PRIMES_LIMIT = 1051
+"""Highest step of `m_HashPrimes`, last of the HLSDK table."""
+
+
+class NodeHull (IntEnum):
+    small = 0
+    human = 1
+    large = 2
+    fly = 3
+
+
+class LinkInfo (IntFlag):
+    small_hull = 1 << 0
+    human_hull = 1 << 1
+    large_hull = 1 << 2
+    fly_hull = 1 << 3
+    disabled = 1 << 4
+
+
+NODE_LAND = 1 << 0
+"""`bits_NODE_LAND`."""
+
+_NODE = Struct( "<3f3f3Bx3i8ifi2hf" )
+"""`CNode`."""
+_LINK = Struct( "<3i4sif" )
+"""`CLink`."""
+_DIST_INFO = Struct( "<4i" )
+_NODE_PAIR = Struct( "<hh" )
+"""`tagNodePair`, the key of the link hash table."""
+_GRAPH = Struct(
+    "<3i3i3ii"
+    f"{3 * NUM_RANGES}i{3 * NUM_RANGES}i"
+    "fi6i6ii3f3f"
+    f"{CACHE_SIZE * 16}x"
+    "16iiiii"
+)
+"""`CGraph`, its pointers are reset when loaded, the cache is empty."""
+
+
+@dataclass( frozen=True, slots=True )
+class GraphLink ():
+    src: int
+    dest: int
+    info: LinkInfo
+    weight: float
+    """2D length, in world units."""
+
+
+@dataclass( slots=True )
+class NodeGraph ():
+    """Nodes & links of a `.nod`, the rest of it is derived when written."""
+    origins: list[tuple[float, float, float]]
+    """Node origins, `NODE_HEIGHT` above the floor."""
+    links: list[GraphLink]
+    """Sorted by source node."""
+    rejected: int = 0
+    """Links dropped as too far apart in the node order, see `MAX_ROUTE_JUMP`."""
+
+    def to_bytes (self) -> bytes:
+        """`.nod` file content."""
+        n = len( self.origins )
+        if n > MAX_NODES:
+            raise ValueError( f"Too many nodes, {n} over {MAX_NODES}" )
+        first_link = [0] * n
+        num_links = [0] * n
+        for i, link in enumerate( self.links ):
+            if not num_links[link.src]:
+                first_link[link.src] = i
+            num_links[link.src] += 1
+
+        regions, sorted_by, range_start, range_end, region_min, region_max = BuildRegionTables( self.origins )
+        route_info, next_best = ComputeStaticRoutingTables( n, self.links )
+        hash_primes, hash_links = BuildLinkLookups( self.links )
+
+        out = bytearray()
+        out += GRAPH_VERSION.to_bytes( 4, "little" )
+        out += _GRAPH.pack(
+            1, 0, 1
+            , 0, 0, 0
+            , n, len( self.links ), len( route_info )
+            , 0
+            , *(x for row in range_start for x in row)
+            , *(x for row in range_end for x in row)
+            , 0.0, 0
+            , *([0] * 12)
+            , 0
+            , *region_min, *region_max
+            , *hash_primes
+            , 0, len( hash_links )
+            , 0, 0
+        )
+        for i, origin in enumerate( self.origins ):
+            out += _NODE.pack(
+                *origin, *origin
+                , *regions[i]
+                , NODE_LAND, num_links[i], first_link[i]
+                , *(x for hull in next_best[i] for x in hull)
+                , 0.0, 0
+                , 0, 0, 0.0
+            )
+        for link in self.links:
+            out += _LINK.pack( link.src, link.dest, 0, b"", link.info, link.weight )
+        for i in range( n ):
+            out += _DIST_INFO.pack( *(x[i] for x in sorted_by), 0 )
+        out += route_info
+        out += b"".join( x.to_bytes(2, "little", signed=True) for x in hash_links )
+        return bytes( out )
+
+
+def node_graph_path (bsp_file: str | pathlib.Path) -> pathlib.Path:
+    """`.nod` of a map, in `graphs` next to the BSP like `maps/graphs`."""
+    bsp_file = pathlib.Path( bsp_file )
+    return bsp_file.parent / "graphs" / bsp_file.with_suffix( ".nod" ).name
+
+
+def _get_link_info (source: NavArea, target: NavArea, portal_width: float | None) -> LinkInfo:
+    """Hulls able to walk between two areas, `portal_width` is None within the same area."""
+    info = LinkInfo.small_hull | LinkInfo.fly_hull
+    if source.attribute_flags.crouch or target.attribute_flags.crouch:
+        return info
+    info |= LinkInfo.human_hull
+    narrowest = min(
+        min( x.area_extent.ks_instances_delta.x, x.area_extent.ks_instances_delta.y )
+        for x in (source, target)
+    )
+    if narrowest >= LARGE_HULL_WIDTH and (portal_width is None or portal_width >= LARGE_HULL_WIDTH):
+        info |= LinkInfo.large_hull
+    return info
+
+
+def build_node_graph (nodes: list[InfoNodeEntity]) -> NodeGraph:
+    """Graph of the given `info_node`s, as placed by `iter_navarea_ent`.
+
+    Nodes are reordered to keep linked ones close in the file,
+    links still too far apart for the routes are dropped.
+    The given order does not matter, merged IDs order the `.ent` by hash.
+    """
+    nodes = sorted( nodes, key=lambda x:tuple( x.origin ) )
+    n = len( nodes )
+    origins = list[tuple[float, float, float]]()
+    owners = list[set[NavArea]]()
+    area_nodes = dict[NavArea, list[int]]()
+    for i, ent in enumerate( nodes ):
+        origins.append( (ent.origin.x, ent.origin.y, ent.get_source().GetZ( ent.origin ) + NODE_HEIGHT) )
+        areas = set[NavArea]()
+        for member in ent.merged_nodes or (ent,):
+            areas.add( member.source )
+            if member.target:
+                areas.add( member.target )
+        owners.append( areas )
+        for area in areas:
+            area_nodes.setdefault( area, [] ).append( i )
+
+    # Hulls of each pair of linked areas.
+    area_links = dict[NavArea, dict[NavArea, LinkInfo]]()
+    for area in area_nodes:
+        targets = area_links[area] = { area: _get_link_info(area, area, None) }
+        for connections in area.area_adjacents_per_directions:
+            dir = connections.ks_instances_direction
+            for connection in connections.entries:
+                target: NavArea = connection.area
+                if target not in area_nodes:
+                    continue
+                _, _, half_width = area.get_portal( target, dir )
+                targets[target] = targets.get( target, LinkInfo(0) ) | _get_link_info( area, target, half_width * 2.0 )
+
+    candidates = list[list[tuple[float, int, LinkInfo]]]()
+    for i in range( n ):
+        found = dict[int, LinkInfo]()
+        for area in owners[i]:
+            for target, info in area_links[area].items():
+                for j in area_nodes[target]:
+                    if j != i:
+                        found[j] = found.get( j, LinkInfo(0) ) | info
+        x, y, _ = origins[i]
+        links = sorted(
+            (sqrt( (origins[j][0] - x) ** 2 + (origins[j][1] - y) ** 2 ), j, info)
+            for j, info in found.items()
+        )
+        candidates.append( RejectInlineLinks(origins[i], links[:MAX_NODE_INITIAL_LINKS], origins) )
+
+    # Reverse Cuthill-McKee, linked nodes get close indices.
+    neighbours = [set[int]() for _ in range( n )]
+    for i, links in enumerate( candidates ):
+        for _, j, _ in links:
+            neighbours[i].add( j )
+            neighbours[j].add( i )
+    order = list[int]()
+    visited = [False] * n
+    for start in sorted( range(n), key=lambda x:(len( neighbours[x] ), x) ):
+        if visited[start]:
+            continue
+        visited[start] = True
+        queue = [start]
+        for i in queue:
+            for j in sorted( neighbours[i], key=lambda x:(len( neighbours[x] ), x) ):
+                if not visited[j]:
+                    visited[j] = True
+                    queue.append( j )
+        order += queue
+    order.reverse()
+    index_of = { old: new for new, old in enumerate(order) }
+
+    links = list[GraphLink]()
+    rejected = 0
+    for new, old in enumerate( order ):
+        for weight, j, info in candidates[old]:
+            dest = index_of[j]
+            if _get_route_delta( new, dest, n ) is None:
+                rejected += 1
+                continue
+            links.append( GraphLink(new, dest, info, weight) )
+    return NodeGraph( [origins[x] for x in order], links, rejected )
+
+
+def write_node_graph (
+    nodes: list[InfoNodeEntity]
+    , path: str | pathlib.Path
+    , bsp_file: str | pathlib.Path = None
+) -> NodeGraph:
+    """Build & write the `.nod` of the given `info_node`s, replaced once complete.
+
+    Its time is kept no older than `bsp_file`, `CGraph::CheckNODFile` rebuilds the graph of newer maps.
+    """
+    graph = build_node_graph( nodes )
+    data = graph.to_bytes()
+    path = pathlib.Path( path )
+    path.parent.mkdir( parents=True, exist_ok=True )
+    temp_path = path.with_name( f"{path.name}.{os.getpid()}.tmp" )
+    temp_path.write_bytes( data )
+    os.replace( temp_path, path )
+    if bsp_file is not None:
+        mtime = max( os.stat(bsp_file).st_mtime_ns, path.stat().st_mtime_ns )
+        os.utime( path, ns=(mtime, mtime) )
+    return graph
+
+
+def RejectInlineLinks (
+    origin: tuple[float, float, float]
+    , links: list[tuple[float, int, LinkInfo]]
+    , origins: list[tuple[float, float, float]]
+) -> list[tuple[float, int, LinkInfo]]:
+    """Drop links in the same 2D direction as a shorter one, `links` sorted by length."""
+    kept = list[tuple[float, int, LinkInfo]]()
+    directions = list[tuple[float, float]]()
+    for weight, j, info in links:
+        dx, dy = origins[j][0] - origin[0], origins[j][1] - origin[1]
+        if weight > 0.0:
+            dx, dy = dx / weight, dy / weight
+        if any(
+            kept[k][0] < weight and dx * x + dy * y >= NODE_INLINE_DOT
+            for k, (x, y) in enumerate( directions )
+        ):
+            continue
+        kept.append( (weight, j, info) )
+        directions.append( (dx, dy) )
+    return kept
+
+
+def BuildRegionTables (origins: list[tuple[float, float, float]]):
+    """Regions of each node, nodes sorted by region of each axis, and their ranges.
+
+    Return `(regions, sorted_by, range_start, range_end, region_min, region_max)`.
+    """
+    n = len( origins )
+    region_min = [min( (x[i] for x in origins), default=999999999.0 ) for i in range( 3 )]
+    region_max = [max( (x[i] for x in origins), default=-999999999.0 ) for i in range( 3 )]
+    regions = [
+        tuple(
+            int( NUM_RANGES * (x[i] - region_min[i]) / (region_max[i] - region_min[i] + 1) )
+            for i in range( 3 )
+        )
+        for x in origins
+    ]
+    sorted_by = list[list[int]]()
+    for i in range( 3 ):
+        # X, Y, Z codes, starting with the sorted axis.
+        axes = ( i, (i + 1) % 3, (i + 2) % 3 )
+        sorted_by.append( sorted(
+            range( n )
+            , key=lambda x:(regions[x][axes[0]] << 16) + (regions[x][axes[1]] << 8) + regions[x][axes[2]]
+        ) )
+    # Same start as the game.
+    range_start = [[255] * NUM_RANGES for _ in range( 3 )]
+    range_end = [[0] * NUM_RANGES for _ in range( 3 )]
+    for j in range( n ):
+        for i in range( 3 ):
+            code = regions[sorted_by[i][j]][i]
+            range_start[i][code] = min( range_start[i][code], j )
+            range_end[i][code] = max( range_end[i][code], j )
+    return (regions, sorted_by, range_start, range_end, region_min, region_max)
+
+
+def _get_route_delta (source: int, target: int, n: int) -> int | None:
+    """Offset from `source` to `target` as stored in routes, None if it does not fit."""
+    for delta in ( target - source, target - source + n, target - source - n ):
+        if -MAX_ROUTE_JUMP - 1 <= delta <= MAX_ROUTE_JUMP:
+            return delta
+    return None
+
+
+def _find_next_nodes (n: int, links: list[GraphLink]) -> list[list[int]]:
+    """Next node of the shortest path from each node to each node, itself if unreachable.
+
+    Dijkstra from each node, graphs are sparse.
+    """
+    edges = [list[tuple[float, int]]() for _ in range( n )]
+    for link in links:
+        edges[link.src].append( (link.weight, link.dest) )
+    result = list[list[int]]()
+    for source in range( n ):
+        after = [source] * n
+        dist = [float( "inf" )] * n
+        dist[source] = 0.0
+        heap = [(0.0, source, source)]
+        while heap:
+            d, i, first = heappop( heap )
+            if d > dist[i]:
+                continue
+            after[i] = first
+            for weight, j in edges[i]:
+                if d + weight < dist[j]:
+                    dist[j] = d + weight
+                    heappush( heap, (d + weight, j, j if i == source else first) )
+        result.append( after )
+    return result
+
+
+def _compress_route (best: list[int], source: int) -> bytes:
+    """One row of routes, `ComputeStaticRoutingTables` phrases.
+
+    A sequence phrase `-count` is nodes that are their own next node,
+    a repeat phrase `count - 1, offset` is nodes of the same next node.
+    """
+    out = bytearray()
+    def emit_repeat (count: int, node: int):
+        out.append( count - 1 )
+        out.append( _get_route_delta(source, node, len( best )) & 0xFF )
+
+    last = None
+    sequence = 0
+    repeats = 0
+    for i, node in enumerate( best ):
+        can_repeat = node == last and repeats < 127
+        can_sequence = node == i and sequence < 128
+        if repeats:
+            if can_repeat:
+                repeats += 1
+            else:
+                emit_repeat( repeats, last )
+                repeats = 0
+                if can_sequence:
+                    sequence += 1
+                else:
+                    repeats += 1
+        elif sequence:
+            if can_sequence:
+                sequence += 1
+            elif sequence == 1 and can_repeat:
+                # A single node sequence joins the repeat.
+                repeats = 2
+                sequence = 0
+            else:
+                out.append( -sequence & 0xFF )
+                sequence = 0
+                repeats += 1
+        elif can_sequence:
+            sequence += 1
+        else:
+            repeats += 1
+        last = node
+    if repeats:
+        emit_repeat( repeats, last )
+    if sequence:
+        out.append( -sequence & 0xFF )
+    return bytes( out )
+
+
+def NextNodeInRoute (route_info: bytes, offset: int, current: int, dest: int, n: int) -> int:
+    """Next node from `current` to `dest`, its routes at `offset` of `route_info`."""
+    count = dest + 1
+    while count > 0:
+        ch = route_info[offset] - 256 if route_info[offset] > 127 else route_info[offset]
+        offset += 1
+        if ch < 0:
+            if count <= -ch:
+                return dest
+            count += ch
+        else:
+            if count <= ch + 1:
+                delta = route_info[offset] - 256 if route_info[offset] > 127 else route_info[offset]
+                return (current + delta) % n
+            count -= ch + 1
+            offset += 1
+    return current
+
+
+def ComputeStaticRoutingTables (n: int, links: list[GraphLink]):
+    """Compressed routes of every hull & capability, and where each node's start.
+
+    Return `(route_info, next_best)`, `next_best` of each node is `[hull][capability]`.
+    Links never need to open doors, both capabilities have the same routes.
+    Same rows are stored once.
+    """
+    route_info = bytearray()
+    offsets = dict[bytes, int]()
+    next_best = [[[0, 0] for _ in range( MAX_NODE_HULLS )] for _ in range( n )]
+    tables = dict[tuple[int, ...], list[int]]()
+    for hull in NodeHull:
+        mask = LinkInfo( 1 << hull )
+        enabled = [x for x in links if x.info & mask]
+        key = tuple( i for i, x in enumerate(links) if x.info & mask )
+        if key not in tables:
+            rows = list[int]()
+            for source, best in enumerate( _find_next_nodes(n, enabled) ):
+                row = _compress_route( best, source )
+                if row not in offsets:
+                    offsets[row] = len( route_info )
+                    route_info += row
+                rows.append( offsets[row] )
+            tables[key] = rows
+        for source, offset in enumerate( tables[key] ):
+            next_best[source][hull] = [offset, offset]
+    return (bytes( route_info ), next_best)
+
+
+def HashChoosePrimes (size: int) -> list[int]:
+    """16 probing steps of a hash table of `size`, each prime with it."""
+    largest = max( 1, min(size // 2, _PRIMES_LIMIT) )
+    sieve = [True] * (largest + 1)
+    primes = [1]
+    for i in range( 2, largest + 1 ):
+        if sieve[i]:
+            sieve[i * i::i] = [False] * len( range(i * i, largest + 1, i) )
+            if size % i:
+                primes.append( i )
+    # Evenly spread, every other one negative.
+    steps = [primes[len( primes ) * k // 16] for k in range( 16 )]
+    return [size - x if k % 2 == 0 else x for k, x in enumerate( steps )]
+
+
+def _hash_link (src: int, dest: int) -> int:
+    """CRC32 of the `tagNodePair` of two nodes, as `CGraph::HashInsert` & `HashSearch`."""
+    return crc32( _NODE_PAIR.pack(src, dest) )
+
+
+def BuildLinkLookups (links: list[GraphLink]) -> tuple[list[int], list[int]]:
+    """`(m_HashPrimes, m_pHashLinks)`, the link index of each node pair, open addressing."""
+    size = 3 * len( links ) // 2 + 3
+    if len(links) > 0x7FFF:
+        raise ValueError( f"Too many links, {len(links)} over {0x7FFF}" )
+    primes = HashChoosePrimes( size )
+    table = [ENTRY_STATE_EMPTY] * size
+    for key, link in enumerate( links ):
+        digest = _hash_link( link.src, link.dest )
+        step = primes[digest & 15]
+        i = (digest >> 4) % size
+        while table[i] != ENTRY_STATE_EMPTY:
+            i = (i + step) % size
+        table[i] = key
+    return (primes, table)
@@ -0,0 +1,286 @@
+"""Incremental regeneration, for a `.NAV` that only changed in some places.
+
+The candidates of each (area, build flag) are kept along with a fingerprint
+of everything they are computed from, and reused while it is unchanged.
+With the "cluster" merge engine, only clusters around changed candidates
+are merged again. The result is always the same as a full rebuild.
+"""
+from dataclasses import dataclass
+from hashlib import sha256
+import json
+import os
+import pathlib
+from .kaitai.nav import NavArea, Vector
+from .utils import (
+    InfoNodeEntity
+    , Nav2EntSession
+    , MERGE_ENGINES
+    , AREA_INSIDE_SIZE
+    , ENTITY_OFFSET_Z_ADD
+    , ENTITY_HULL_DEFAULT_MIN
+    , ENTITY_HULL_DEFAULT_MAX
+    , iter_navarea_ent_portal
+    , iter_navarea_ent_encounter
+    , iter_navarea_ent_inside
+    , iter_node_cells
+    , iter_sorted_nodes
+    , find_node_clusters
+    , build_node_clusters
+)
+
+
+
+INCREMENTAL_VERSION = 2
+"""Bump when candidates or fingerprints change, older states are then ignored."""
+INCREMENTAL_SUFFIX = ".n2einc"
+
+NodeKey = tuple[int, str, int]
+"""Area ID, build flag, index of the candidate within them."""
+
+
+@dataclass( slots=True )
+class IncrementalState ():
+    """What a run leaves for the next one."""
+    params: tuple
+    """Everything that changes all candidates, the state is dropped if different."""
+    groups: dict[tuple[int, str], tuple[tuple, list[tuple]]]
+    """(area ID, build flag) -> (fingerprint, candidates as (x, y, z, target ID))."""
+    clusters: list[tuple[list[NodeKey], tuple[float, ...]]]
+    """Cluster members and their AABB, "cluster" merge engine only."""
+
+    @classmethod
+    def load (cls, path: str | pathlib.Path, params: tuple):
+        """Previous state, an empty one if missing, unreadable or of other params.
+
+        States are JSON, never code, as they may sit next to maps of anyone.
+        """
+        try:
+            with open( path, "r", encoding="utf-8" ) as fp:
+                data = _to_tuples( json.load(fp) )
+            state = cls(
+                data[0]
+                , { (area_id, flag): (fingerprint, candidates) for area_id, flag, fingerprint, candidates in data[1] }
+                , [ (list( members ), aabb) for members, aabb in data[2] ]
+            )
+        except (OSError, ValueError, TypeError, IndexError):
+            state = None
+        if state is None or state.params != params:
+            state = cls( params, {}, [] )
+        return state
+
+    def save (self, path: str | pathlib.Path):
+        path = pathlib.Path( path )
+        temp_path = path.with_name( f"{path.name}.{os.getpid()}.tmp" )
+        data = (
+            self.params
+            , [ (area_id, flag, fingerprint, candidates) for (area_id, flag), (fingerprint, candidates) in self.groups.items() ]
+            , self.clusters
+        )
+        with temp_path.open( "w", encoding="utf-8" ) as fp:
+            json.dump( data, fp, separators=(",", ":") )
+        os.replace( temp_path, path )
+
+
+def _to_tuples (o):
+    """JSON arrays back into the tuples they were saved from."""
+    if isinstance( o, list ):
+        return tuple( _to_tuples(x) for x in o )
+    return o
+
+
+def incremental_state_path (bsp_file: str | pathlib.Path, cache_dir: str | pathlib.Path = None) -> pathlib.Path:
+    """State file of a map, next to the BSP, or in `cache_dir` by its full path."""
+    bsp_file = pathlib.Path( bsp_file )
+    if cache_dir is None:
+        return bsp_file.with_suffix( INCREMENTAL_SUFFIX )
+    digest = sha256( str(bsp_file.resolve()).encode("utf-8") ).hexdigest()[:16]
+    return pathlib.Path( cache_dir, f"{bsp_file.stem}-{digest}{INCREMENTAL_SUFFIX}" )
+
+
+def _area_key (area: NavArea | None) -> tuple | None:
+    """Geometry of an area, that candidates are computed from."""
+    if area is None:
+        return None
+    ext = area.area_extent
+    return (tuple(ext.lo), tuple(ext.hi), area.corner_northeast_z, area.corner_southwest_z)
+
+
+def build_navarea_ent_incremental (
+    session: Nav2EntSession
+    , state_path: str | pathlib.Path
+    , flags: str = "c"
+    , merge: str = MERGE_ENGINES[0]
+):
+    """Same `info_node`s as `session.iter_navarea_ent( flags=flags, merge=merge )`,
+    reusing the state of the previous run at `state_path`, then saving the new one.
+
+    Return `(nodes, reused, total)`, counts of (area, build flag) candidates.
+    """
+    if merge not in MERGE_ENGINES:
+        raise ValueError( f"Unknown merge engine {merge}" )
+    flags_clean = "".join( dict.fromkeys(x for x in flags.lower() if x in "abc") )
+    params = (
+        INCREMENTAL_VERSION
+        , flags_clean
+        , merge
+        , AREA_INSIDE_SIZE
+        , ENTITY_OFFSET_Z_ADD
+        , tuple( ENTITY_HULL_DEFAULT_MIN )
+        , tuple( ENTITY_HULL_DEFAULT_MAX )
+    )
+    state = IncrementalState.load( state_path, params )
+    mesh = session.mesh
+    areas = session.filter_navarea_buildable()
+    # Candidates are keyed by area ID.
+    if len(set( x.id for x in areas )) != len(areas):
+        state.groups.clear()
+        state.clusters.clear()
+
+    nodes = list[InfoNodeEntity]()
+    keys = list[NodeKey]()
+    dirty = list[int]()
+    groups = dict[tuple[int, str], tuple[tuple, list[tuple]]]()
+    reused = set[tuple[int, str]]()
+    for area in areas:
+        for flag in flags_clean:
+            # Same order & marks as `Nav2EntSession.iter_navarea_ent_candidates`.
+            if flag == "a":
+                links = list( session.iter_navarea_connect_unmarked(area) )
+                fingerprint = (
+                    _area_key( area )
+                    , tuple( (dir.value, target.id, _area_key(target)) for target, dir in links )
+                )
+            elif flag == "b":
+                fingerprint = tuple(
+                    (
+                        getattr(spot.source.area_connection.area, "id", None)
+                        , tuple( spot.path.source )
+                        , getattr(spot.target.area_connection.area, "id", None)
+                        , tuple( spot.path.target )
+                    )
+                    for spot in area.encounter_spots.entries
+                    if not area.encounter_spots.ks_instances_is_legacy
+                )
+            else:
+                fingerprint = _area_key( area )
+
+            key = (area.id, flag)
+            old = state.groups.get( key )
+            if old is not None and old[0] == fingerprint:
+                group = [
+                    InfoNodeEntity(
+                        area
+                        , Vector.from_raw( x, y, z )
+                        , mesh.GetNavAreaByID( target_id ) if target_id is not None else None
+                    )
+                    for x, y, z, target_id in old[1]
+                ]
+                groups[key] = old
+                reused.add( key )
+            else:
+                if flag == "a":
+                    group = [
+                        InfoNodeEntity( area, origin, target )
+                        for link in links
+                        for target, origin in iter_navarea_ent_portal( area, *link )
+                    ]
+                elif flag == "b":
+                    group = [
+                        InfoNodeEntity( area, origin, target )
+                        for target, origin, _ in iter_navarea_ent_encounter( area )
+                    ]
+                else:
+                    group = [
+                        InfoNodeEntity( area, origin, None )
+                        for origin in iter_navarea_ent_inside( area )
+                    ]
+                groups[key] = (
+                    fingerprint
+                    , [
+                        (x.origin.x, x.origin.y, x.origin.z, x.target.id if x.target else None)
+                        for x in group
+                    ]
+                )
+                dirty.extend( range(len(nodes), len(nodes) + len(group)) )
+            keys.extend( (area.id, flag, k) for k in range(len(group)) )
+            nodes.extend( group )
+
+    clusters = list[list[int]]()
+    if merge == "incremental":
+        # Order dependent, merged again as a whole.
+        for ent in nodes:
+            session.add_node( ent )
+        result = list( session.nodes )
+    else:
+        clusters = _find_clusters_incremental( nodes, keys, dirty, reused, state.clusters )
+        result = build_node_clusters( nodes, clusters )
+
+    state.groups = groups
+    state.clusters = [
+        ([keys[i] for i in members], _nodes_aabb( [nodes[i] for i in members] ))
+        for members in clusters
+    ]
+    state.save( state_path )
+    return (list( iter_sorted_nodes(result) ), len( reused ), len( groups ))
+
+
+def _nodes_aabb (nodes: list[InfoNodeEntity]) -> tuple[float, ...]:
+    return (
+        min( x.absmin.x for x in nodes )
+        , min( x.absmin.y for x in nodes )
+        , min( x.absmin.z for x in nodes )
+        , max( x.absmax.x for x in nodes )
+        , max( x.absmax.y for x in nodes )
+        , max( x.absmax.z for x in nodes )
+    )
+
+
+def _find_clusters_incremental (
+    nodes: list[InfoNodeEntity]
+    , keys: list[NodeKey]
+    , dirty: list[int]
+    , reused: set[tuple[int, str]]
+    , old_clusters: list[tuple[list[NodeKey], tuple[float, ...]]]
+) -> list[list[int]]:
+    """Same clusters as `find_node_clusters( nodes )`, only searched around `dirty` nodes.
+
+    Old clusters made only of reused nodes stay the same, unless a dirty node
+    overlaps them. They never overlap each other, or they would be one cluster.
+    """
+    index_of = dict[NodeKey, int]( (x, i) for i, x in enumerate(keys) )
+    seeds = set[int]( dirty )
+    kept = list[tuple[list[int], tuple[float, ...]]]()
+    for members, aabb in old_clusters:
+        if all( (x[0], x[1]) in reused for x in members ):
+            kept.append( (sorted( index_of[x] for x in members ), aabb) )
+        else:
+            # Some nodes are gone, what is left has to be merged again.
+            seeds.update( index_of[x] for x in members if (x[0], x[1]) in reused )
+
+    cells = dict[tuple[int, int], list[int]]()
+    for k, (_, aabb) in enumerate( kept ):
+        for cell in iter_node_cells( Vector.from_raw(*aabb[:3]), Vector.from_raw(*aabb[3:]) ):
+            cells.setdefault( cell, [] ).append( k )
+    pulled = set[int]()
+    for i in seeds:
+        node = nodes[i]
+        for cell in iter_node_cells( node.absmin, node.absmax ):
+            for k in cells.get( cell, () ):
+                if k in pulled:
+                    continue
+                members, aabb = kept[k]
+                if (
+                    node.absmin.x > aabb[3] or node.absmin.y > aabb[4] or node.absmin.z > aabb[5]
+                    or node.absmax.x < aabb[0] or node.absmax.y < aabb[1] or node.absmax.z < aabb[2]
+                ):
+                    continue
+                if any( nodes[j].is_intersects(node) for j in members ):
+                    pulled.add( k )
+
+    local = sorted( seeds.union(*(kept[k][0] for k in pulled)) )
+    clusters = [
+        [local[j] for j in members]
+        for members in find_node_clusters( [nodes[i] for i in local] )
+    ]
+    clusters.extend( members for k, (members, _) in enumerate(kept) if k not in pulled )
+    return clusters
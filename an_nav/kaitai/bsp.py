@@ -1,6 +1,12 @@
 from enum import EnumMeta
+import errno
+import kaitaistruct
+import mmap
+import os
+import pathlib
+from struct import Struct
 from sys import modules
-from ..lark.ent import TRANSFORM_TYPE, EntLark
+from ..lark.ent import TRANSFORM_TYPE, parse_ent
 from ._bsp_basic import *
 
 
@@ -14,7 +20,152 @@ for k,v in BspFile.__dict__.items():
 class LumpContentEntities (BspFile.LumpContentEntities):
     def __init__ (self, _io, _parent=None, _root=None):
         super().__init__( _io, _parent, _root )
-        self.blocks: TRANSFORM_TYPE = EntLark.parse( self.blocks )
+        self.blocks: TRANSFORM_TYPE = parse_ent( self.blocks )
 
 
 BspFile.LumpContentEntities = LumpContentEntities
+
+
+_BSP_HEADER = Struct( "<i30i" )
+"""Version, then offset & size of each lump."""
+
+
+def read_entities_lump (path: str) -> str:
+    """Read only the entities lump of a BSP, same as `LumpContentEntities` raw text.
+
+    The file is memory-mapped, only the header and the lump itself are touched.
+    """
+    with open( path, "rb" ) as fp:
+        file_size = os.fstat( fp.fileno() ).st_size
+        # Empty files can not be mapped.
+        if file_size < _BSP_HEADER.size:
+            raise EOFError( f"requested {_BSP_HEADER.size} bytes, but only {file_size} bytes available" )
+        with mmap.mmap( fp.fileno(), 0, access=mmap.ACCESS_READ ) as buf:
+            return _read_entities_lump( buf )
+
+
+def _unpack_header (buf: bytes) -> tuple[int, list[int]]:
+    """Version, then offset & size of each lump."""
+    version, *lumps = _BSP_HEADER.unpack_from( buf )
+    if not version == 30:
+        _io = KaitaiStream( BytesIO(buf[:4]) )
+        _io.seek( 4 )
+        raise kaitaistruct.ValidationNotEqualError( 30, version, _io, u"/seq/0" )
+    return (version, lumps)
+
+
+def _read_entities_lump (buf: mmap.mmap) -> str:
+    version, lumps = _unpack_header( buf )
+    offset = lumps[BspFile.LumpType.entities.value * 2]
+    size = lumps[BspFile.LumpType.entities.value * 2 + 1]
+    if offset < 0 or size < 0 or offset + size > len(buf):
+        raise EOFError( f"requested {size} bytes, but only {max(0, len(buf) - offset)} bytes available" )
+    end = buf.find( b"\0", offset, offset + size )
+    if end < 0:
+        end = offset + size
+    with memoryview( buf ) as view, view[offset:end] as content:
+        return str( content, "ascii" )
+
+
+def read_entities (path: str, parser: str = None) -> TRANSFORM_TYPE:
+    """Same as `BspFile.from_file(path)`'s entities lump blocks, without parsing the rest.
+
+    `parser` is one of `ENT_PARSERS`.
+    """
+    return parse_ent( read_entities_lump(path), parser )
+
+
+BSP_LUMP_ALIGN = 4
+"""Lumps start at a multiple of it."""
+COPY_CHUNK_SIZE = 1 << 20
+"""Read & write size of `copy_fd_range` without kernel copy."""
+
+
+def _write_all (fd: int, data: bytes):
+    with memoryview( data ) as view:
+        while view:
+            view = view[os.write( fd, view ):]
+
+
+def copy_fd_range (src_fd: int, dst_fd: int, offset: int, size: int):
+    """Copy `size` bytes at `offset` of `src_fd` to the current position of `dst_fd`.
+
+    `os.copy_file_range`, or else `os.sendfile`, keep the bytes within the kernel,
+    read & write in chunks are used if neither works for these files.
+    """
+    end = offset + size
+    for name in ( "copy_file_range", "sendfile" ):
+        if offset >= end or not hasattr( os, name ):
+            continue
+        try:
+            while offset < end:
+                if name == "copy_file_range":
+                    copied = os.copy_file_range( src_fd, dst_fd, end - offset, offset )
+                else:
+                    copied = os.sendfile( dst_fd, src_fd, offset, end - offset )
+                if not copied:
+                    raise EOFError( f"requested {end - offset} bytes, but none available at {offset}" )
+                offset += copied
+        except OSError as e:
+            # Not supported between these files, continue where it stopped.
+            if e.errno not in ( errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EBADF ):
+                raise
+    while offset < end:
+        os.lseek( src_fd, offset, os.SEEK_SET )
+        chunk = os.read( src_fd, min(end - offset, COPY_CHUNK_SIZE) )
+        if not chunk:
+            raise EOFError( f"requested {end - offset} bytes, but none available at {offset}" )
+        _write_all( dst_fd, chunk )
+        offset += len( chunk )
+
+
+def write_entities_lump (path: str, out_path: str, text: str) -> int:
+    """Write the BSP at `path` into `out_path`, with `text` as its entities lump.
+
+    Lumps keep their order in the file, each moved right after the previous one, aligned.
+    Other lumps are copied as is with `copy_fd_range`, bytes outside of any lump are dropped.
+    `out_path` is replaced once complete, it may be `path` itself.
+    Return the size of the written file.
+    """
+    content = text.encode( "ascii" ) + b"\0"
+    out_path = pathlib.Path( out_path )
+    temp_path = out_path.with_name( f"{out_path.name}.{os.getpid()}.tmp" )
+    with open( path, "rb" ) as src:
+        src_fd = src.fileno()
+        file_size = os.fstat( src_fd ).st_size
+        if file_size < _BSP_HEADER.size:
+            raise EOFError( f"requested {_BSP_HEADER.size} bytes, but only {file_size} bytes available" )
+        version, lumps = _unpack_header( src.read(_BSP_HEADER.size) )
+        entities = BspFile.LumpType.entities.value
+        # Empty lumps first, to keep the same layout when written again.
+        order = sorted( range(len( lumps ) // 2), key=lambda x:(lumps[x * 2], lumps[x * 2 + 1], x) )
+        new_lumps = list( lumps )
+        position = _BSP_HEADER.size
+        for i in order:
+            offset, size = lumps[i * 2], lumps[i * 2 + 1]
+            if i == entities:
+                size = len( content )
+            elif offset < 0 or size < 0 or offset + size > file_size:
+                raise EOFError( f"requested {size} bytes, but only {max(0, file_size - offset)} bytes available" )
+            position += -position % BSP_LUMP_ALIGN
+            new_lumps[i * 2], new_lumps[i * 2 + 1] = position, size
+            position += size
+
+        try:
+            with open( temp_path, "wb", buffering=0 ) as dst:
+                dst_fd = dst.fileno()
+                _write_all( dst_fd, _BSP_HEADER.pack(version, *new_lumps) )
+                position = _BSP_HEADER.size
+                for i in order:
+                    offset, size = new_lumps[i * 2], new_lumps[i * 2 + 1]
+                    _write_all( dst_fd, bytes(offset - position) )
+                    if i == entities:
+                        _write_all( dst_fd, content )
+                    else:
+                        copy_fd_range( src_fd, dst_fd, lumps[i * 2], size )
+                    position = offset + size
+        except BaseException:
+            temp_path.unlink( missing_ok=True )
+            raise
+    os.replace( temp_path, out_path )
+    return position
@@ -1,5 +1,6 @@
 from enum import EnumMeta, auto
 from math import ceil, floor, sqrt
+from struct import Struct
 from sys import modules
 from typing import Type
 from warnings import warn
@@ -40,6 +41,8 @@ ApproachInfo: Type[NavCsczFile.ApproachInfo] = ApproachInfo
 
 NUM_DIRECTIONS: int = DirectionType.num_directions.value
 """Directions count."""
+NAV_LAZY_SECTIONS: tuple[str, ...] = ("hiding_spots", "approach_areas", "encounter_spots")
+"""`NavArea` sections that `NavMesh` can parse on first access."""
 
 
 def OppositeDirection (dir: DirectionType) -> DirectionType:
@@ -54,20 +57,47 @@ def OppositeDirection (dir: DirectionType) -> DirectionType:
     return DirectionType.north
 
 
-class Vector (NavCsczFile.Vector):
+_F32_VECTOR = Struct( "<3f" )
+"""Packed `vector` layout of the `.NAV` file."""
+
+
+class Vector ():
+    """Plain 3D vector used for all in-memory math.
+
+    Components are rounded to float32 whenever a vector is built,
+    like the `.NAV` storage does, so results stay the same as reading
+    them back from the file.
+    """
+    __slots__ = ( "x", "y", "z" )
+
+    def __init__ (self: "Vector", x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        (self.x
+        , self.y
+        , self.z) = _F32_VECTOR.unpack( _F32_VECTOR.pack(x, y, z) )
+
     @classmethod
-    def from_list (cls: "Vector", v: list[float], _parent=None, _root=None):
-        self = cls.from_bytes( b''.join(KaitaiStream.packer_f4le.pack(x) for x in v) )
-        self._parent = _parent
-        self._root = _root if _root else self
+    def from_list (cls: Type["Vector"], v: list[float]):
+        return cls( *v )
+
+    @classmethod
+    def from_raw (cls: Type["Vector"], x: float, y: float, z: float):
+        """Vector with the given components as is, without rounding."""
+        self = cls.__new__( cls )
+        (self.x
+        , self.y
+        , self.z) = (x, y, z)
+        return self
+
+    @classmethod
+    def from_bytes (cls: Type["Vector"], buf: bytes):
+        self = cls.__new__( cls )
+        (self.x
+        , self.y
+        , self.z) = _F32_VECTOR.unpack( buf )
         return self
 
     def copy (self: "Vector"):
-        return Vector.from_list([
-            self.x
-            , self.y
-            , self.z
-        ])
+        return Vector( self.x, self.y, self.z )
 
     @property
     def keyvalue (self: "Vector"):
@@ -87,41 +117,44 @@ class Vector (NavCsczFile.Vector):
     def __str__ (self: "Vector"):
         return f"{self.x} {self.y} {self.z}"
 
+    def __repr__ (self: "Vector"):
+        return f"Vector({self.x}, {self.y}, {self.z})"
+
     def __bytes__ (self: "Vector"):
-        return b''.join( KaitaiStream.packer_f4le.pack(x) for x in self )
+        return _F32_VECTOR.pack( self.x, self.y, self.z )
 
     def __len__ (self: "Vector"):
         return self.length
 
     def __hash__ (self) -> int:
-        return hash( tuple(self) )
+        return hash( (self.x, self.y, self.z) )
 
     def __iter__ (self: "Vector"):
-        return iter([ self.x, self.y, self.z ])
+        return iter(( self.x, self.y, self.z ))
 
     def __eq__ (self, other: "Vector") -> bool:
         return tuple(self) == tuple(other)
 
     def __add__ (self: "Vector", other: "Vector"):
-        return Vector.from_list([
+        return Vector(
             self.x + other.x
             , self.y + other.y
             , self.z + other.z
-        ])
+        )
 
     def __sub__ (self: "Vector", other: "Vector"):
-        return Vector.from_list([
+        return Vector(
             self.x - other.x
             , self.y - other.y
             , self.z - other.z
-        ])
+        )
 
     def __mul__ (self: "Vector", v: int|float):
-        return Vector.from_list([
+        return Vector(
             self.x * v
             , self.y * v
             , self.z * v
-        ])
+        )
 
     def _vector_div (self: "Vector", v: int|float, floordiv = False):
         result = [
@@ -140,17 +173,26 @@ class Vector (NavCsczFile.Vector):
         return Vector.from_list( self._vector_div(v, True) )
 
 
-NavCsczFile.Vector = Vector
-VECTOR_ZERO: Vector = Vector.from_list([ 0,0,0 ])
+class VectorStruct (NavCsczFile.Vector):
+    """`vector` reader, parses straight into a plain `Vector`."""
+    def __new__ (cls, _io: KaitaiStream, _parent=None, _root=None):
+        return Vector.from_bytes( _io.read_bytes(_F32_VECTOR.size) )
+
+
+NavCsczFile.Vector = VectorStruct
+VECTOR_ZERO: Vector = Vector()
 """Zero vector."""
 
 
 class Ray (NavCsczFile.Ray):
     @classmethod
-    def from_list (cls: "Ray", v: list[float], _parent=None, _root=None):
-        self = cls.from_bytes( b''.join(bytes(x) for x in v) )
+    def from_list (cls: "Ray", v: list[Vector], _parent=None, _root=None):
+        self = cls.__new__( cls )
+        self._io = None
         self._parent = _parent
         self._root = _root if _root else self
+        (self.source
+        , self.target) = (v[0].copy(), v[1].copy())
         return self
 
 
@@ -182,28 +224,93 @@ class Place (NavCsczFile.Place):
 NavCsczFile.Place = Place
 
 
-THE_HIDING_SPOT_LIST = list["HidingSpot"]()
-"""List of hiding spots."""
-
-
-def GetHidingSpotByID (id: int):
-    """Given a HidingSpot ID, return the associated HidingSpot."""
-    for spot in THE_HIDING_SPOT_LIST:
-        if spot.id == id:
-            return spot
-    return None
-
-
 class HidingSpot (NavCsczFile.HidingSpot):
     def __init__ (self, _io, _parent=None, _root=None):
         super().__init__( _io, _parent, _root )
-        THE_HIDING_SPOT_LIST.append( self )
+        self._root.hiding_spots.append( self )
+        # First one wins, on duplicated IDs.
+        self._root.hiding_spot_by_id.setdefault( self.id, self )
 
 
 NavCsczFile.HidingSpot = HidingSpot
 
 
+class LazySection ():
+    """Mixin of a `NavArea` section list, which can be parsed on first access.
+
+    When lazy for the mesh, only the offset is recorded while parsing,
+    `count` & `entries` are parsed by `NavMesh.load_section`.
+    """
+    _SECTION: str = ""
+
+    def _read (self):
+        if self._SECTION not in self._root.lazy_sections:
+            return super()._read()
+        self._m_offset = self._io.pos()
+        self._skip()
+
+    def _skip (self):
+        """Seek over the section, without parsing it."""
+        raise NotImplementedError( "_skip" )
+
+    def _load (self):
+        """Parse the section at its recorded offset, if not parsed yet."""
+        if "entries" in self.__dict__:
+            return
+        _pos = self._io.pos()
+        self._io.seek( self._m_offset )
+        super()._read()
+        self._io.seek( _pos )
+
+    def __getattr__ (self, name: str):
+        if name in ("count", "entries"):
+            self._root.load_section( self._SECTION )
+            return self.__dict__[name]
+        raise AttributeError( f"{type(self).__name__!r} object has no attribute {name!r}" )
+
+
+class HidingSpotList (LazySection, NavCsczFile.HidingSpotList):
+    _SECTION = "hiding_spots"
+
+    def _skip (self):
+        count = self._io.read_u1()
+        self._io.seek( self._io.pos() + count * (12 if self.ks_instances_is_legacy else 17) )
+
+
+class ApproachInfoList (LazySection, NavCsczFile.ApproachInfoList):
+    _SECTION = "approach_areas"
+
+    def _skip (self):
+        count = self._io.read_u1()
+        self._io.seek( self._io.pos() + count * 14 )
+
+
+class EncounterSpotList (LazySection, NavCsczFile.EncounterSpotList):
+    _SECTION = "encounter_spots"
+
+    def _skip (self):
+        count = self._io.read_u4le()
+        for _ in range( count ):
+            # source, target & path, then the spots.
+            if self.ks_instances_is_legacy:
+                self._io.seek( self._io.pos() + 32 )
+                spots_count = self._io.read_u1()
+                self._io.seek( self._io.pos() + spots_count * 16 )
+            else:
+                self._io.seek( self._io.pos() + 10 )
+                spots_count = self._io.read_u1()
+                self._io.seek( self._io.pos() + spots_count * 5 )
+
+
+NavCsczFile.HidingSpotList = HidingSpotList
+NavCsczFile.ApproachInfoList = ApproachInfoList
+NavCsczFile.EncounterSpotList = EncounterSpotList
+
+
 class NavArea (NavCsczFile.NavArea):
+    place_id: int = 0
+    """Areas have no place before version 5, ie: "no place"."""
+
     def PostLoad (self: "NavArea") -> NavErrorType:
         """Convert loaded IDs to pointers.
         Make sure all IDs are converted, even if corrupt data is encountered.
@@ -220,69 +327,13 @@ class NavArea (NavCsczFile.NavArea):
                     )
                     error = NavErrorType.NAV_CORRUPT_DATA
 
-        # resolve approach area IDs.
-        for a in self.approach_areas.entries:
-            a: ApproachInfo = a
-            aca = a.here
-            if aca.area_id and not aca.area:
-                warn(
-                    f"Corrupt navigation data. Missing Approach Area (here)."
-                    , RuntimeWarning
-                )
-                error = NavErrorType.NAV_CORRUPT_DATA
-            aca = a.prev.area_connection
-            if aca.area_id and not aca.area:
-                warn(
-                    f"Corrupt navigation data. Missing Approach Area (prev)."
-                    , RuntimeWarning
-                )
-                error = NavErrorType.NAV_CORRUPT_DATA
-            aca = a.next.area_connection
-            if aca.area_id and not aca.area:
-                warn(
-                    f"Corrupt navigation data. Missing Approach Area (next)."
-                    , RuntimeWarning
-                )
-                error = NavErrorType.NAV_CORRUPT_DATA
-
-        # resolve spot encounter IDs.
-        for e in self.encounter_spots.entries:
-            e: EncounterSpot = e
-            f = e.source
-            t = e.target
-
-            f_eac = f.area_connection
-            if not f_eac.area:
-                warn(
-                    f"Corrupt navigation data. Missing \"from\" Navigation Area for Encounter Spot."
-                    , RuntimeWarning
-                )
-                error = NavErrorType.NAV_CORRUPT_DATA
-
-            t_eac = t.area_connection
-            if not t_eac.area:
-                warn(
-                    f"Corrupt navigation data. Missing \"to\" Navigation Area for Encounter Spot."
-                    , RuntimeWarning
-                )
-                error = NavErrorType.NAV_CORRUPT_DATA
-
-            if f_eac.area and t_eac.area:
-                # compute path.
-                e.path.target, _ = self.ComputePortal( t_eac.area, t.direction )
-                e.path.source, _ = self.ComputePortal( f_eac.area, f.direction )
-                eyeHeight = HUMAN_HEIGHT_HALF
-                e.path.source.z = f_eac.area.GetZ( e.path.source ) + eyeHeight
-                e.path.target.z = t_eac.area.GetZ( e.path.target ) + eyeHeight
-
-            # resolve HidingSpot IDs.
-            for order in e.spots:
-                if not order.hiding_spot:
-                    warn(
-                        f"Corrupt navigation data. Missing Hiding Spot."
-                        , RuntimeWarning
-                    )
-                    error = NavErrorType.NAV_CORRUPT_DATA
+        # lazy sections are resolved once loaded, by `NavMesh.load_section`.
+        for name in NAV_LAZY_SECTIONS:
+            if name in self._root.lazy_sections:
+                continue
+            section_error = self.post_load_section( name )
+            if section_error != NavErrorType.NAV_OK:
+                error = section_error
 
         # build overlap list.
         ## TODO: Optimize this.
@@ -298,6 +349,80 @@ class NavArea (NavCsczFile.NavArea):
         }'''
         return error
 
+    def post_load_section (self: "NavArea", name: str) -> NavErrorType:
+        """The `PostLoad` part of one of `NAV_LAZY_SECTIONS`."""
+        error = NavErrorType.NAV_OK
+        if name == "approach_areas":
+            # resolve approach area IDs.
+            for a in self.approach_areas.entries:
+                a: ApproachInfo = a
+                aca = a.here
+                if aca.area_id and not aca.area:
+                    warn(
+                        f"Corrupt navigation data. Missing Approach Area (here)."
+                        , RuntimeWarning
+                    )
+                    error = NavErrorType.NAV_CORRUPT_DATA
+                aca = a.prev.area_connection
+                if aca.area_id and not aca.area:
+                    warn(
+                        f"Corrupt navigation data. Missing Approach Area (prev)."
+                        , RuntimeWarning
+                    )
+                    error = NavErrorType.NAV_CORRUPT_DATA
+                aca = a.next.area_connection
+                if aca.area_id and not aca.area:
+                    warn(
+                        f"Corrupt navigation data. Missing Approach Area (next)."
+                        , RuntimeWarning
+                    )
+                    error = NavErrorType.NAV_CORRUPT_DATA
+        elif name == "encounter_spots":
+            if self.encounter_spots.ks_instances_is_legacy:
+                # Old data, read and discarded.
+                return error
+            # resolve spot encounter IDs.
+            for e in self.encounter_spots.entries:
+                e: EncounterSpot = e
+                f = e.source
+                t = e.target
+
+                f_eac = f.area_connection
+                if not f_eac.area:
+                    warn(
+                        f"Corrupt navigation data. Missing \"from\" Navigation Area for Encounter Spot."
+                        , RuntimeWarning
+                    )
+                    error = NavErrorType.NAV_CORRUPT_DATA
+
+                t_eac = t.area_connection
+                if not t_eac.area:
+                    warn(
+                        f"Corrupt navigation data. Missing \"to\" Navigation Area for Encounter Spot."
+                        , RuntimeWarning
+                    )
+                    error = NavErrorType.NAV_CORRUPT_DATA
+
+                if f_eac.area and t_eac.area:
+                    # compute path.
+                    x, y, _ = self.get_portal( t_eac.area, t.direction )
+                    e.path.target = Vector.from_raw( x, y, 0.0 )
+                    x, y, _ = self.get_portal( f_eac.area, f.direction )
+                    e.path.source = Vector.from_raw( x, y, 0.0 )
+                    eyeHeight = HUMAN_HEIGHT_HALF
+                    e.path.source.z = f_eac.area.GetZ( e.path.source ) + eyeHeight
+                    e.path.target.z = t_eac.area.GetZ( e.path.target ) + eyeHeight
+
+                # resolve HidingSpot IDs.
+                for order in e.spots:
+                    if not order.hiding_spot:
+                        warn(
+                            f"Corrupt navigation data. Missing Hiding Spot."
+                            , RuntimeWarning
+                        )
+                        error = NavErrorType.NAV_CORRUPT_DATA
+        return error
+
     def IsOverlapping (self: "NavArea", pos: Vector) -> bool:
         """Return true if 'pos' is within 2D extents of area."""
         return(
@@ -389,50 +514,12 @@ class NavArea (NavCsczFile.NavArea):
         Return center of portal opening, and half-width defining sides of portal from center.
         NOTE: center->z is unset.
         """
-        center: Vector = VECTOR_ZERO.copy()
-        halfWidth: float = 0.0
-        src_ext = self.area_extent
-        tgt_ext = target.area_extent
-        if dir == DirectionType.north or dir == DirectionType.south:
-            if dir == DirectionType.north:
-                center.y = src_ext.lo.y
-            else:
-                center.y = src_ext.hi.y
-
-            left: float = max( src_ext.lo.x, tgt_ext.lo.x )
-            right: float = min( src_ext.hi.x, tgt_ext.hi.x )
-            # clamp to our extent in case areas are disjoint.
-            if left < src_ext.lo.x:
-                left = src_ext.lo.x
-            elif left > src_ext.hi.x:
-                left = src_ext.hi.x
-            if right < src_ext.lo.x:
-                right = src_ext.lo.x
-            elif right > src_ext.hi.x:
-                right = src_ext.hi.x
-            center.x = (left + right) / 2.0
-            halfWidth = (right - left) / 2.0
-        else:
-            # EAST or WEST.
-            if dir == DirectionType.west:
-                center.x = src_ext.lo.x
-            else:
-                center.x = src_ext.hi.x
-
-            top: float = max( src_ext.lo.y, tgt_ext.lo.y )
-            bottom: float = min( src_ext.hi.y, tgt_ext.hi.y )
-            # clamp to our extent in case areas are disjoint.
-            if top < src_ext.lo.y:
-                top = src_ext.lo.y
-            elif top > src_ext.hi.y:
-                top = src_ext.hi.y
-            if bottom < src_ext.lo.y:
-                bottom = src_ext.lo.y
-            elif bottom > src_ext.hi.y:
-                bottom = src_ext.hi.y
-            center.y = (top + bottom) / 2.0
-            halfWidth = (bottom - top) / 2.0
-        return (center, halfWidth)
+        x, y, halfWidth = _compute_portal( self.area_extent, target.area_extent, dir )
+        return (Vector.from_raw( x, y, 0.0 ), halfWidth)
+
+    def get_portal (self: "NavArea", target: "NavArea", dir: DirectionType) -> tuple[float, float, float]:
+        """`(center x, center y, half-width)` of `ComputePortal`, without building a `Vector`."""
+        return _compute_portal( self.area_extent, target.area_extent, dir )
 
     def get_aligned_origin (self: "NavArea", pos: Vector) -> Vector|None:
         if not self.IsOverlapping( pos ):
@@ -470,7 +557,11 @@ class EncounterSpotOrder (NavCsczFile.EncounterSpotOrder):
     @property
     def hiding_spot (self: "EncounterSpotOrder"):
         """HidingSpot object of this connection."""
-        return GetHidingSpotByID( self.hiding_spot_id )
+        if hasattr(self, '_m_hiding_spot'):
+            return self._m_hiding_spot
+
+        self._m_hiding_spot = self._root.GetHidingSpotByID( self.hiding_spot_id )
+        return self._m_hiding_spot
 
 
 NavCsczFile.EncounterSpotOrder = EncounterSpotOrder
@@ -479,8 +570,12 @@ NavCsczFile.EncounterSpotOrder = EncounterSpotOrder
 class NavConnect (NavCsczFile.NavConnect):
     @property
     def area (self: "NavConnect"):
-        """NavArea object of this connection."""
-        return THE_NAV_AREA_GRID.GetNavAreaByID( self.area_id )
+        """NavArea object of this connection, resolved once by `NavArea.PostLoad`."""
+        if hasattr(self, '_m_area'):
+            return self._m_area
+
+        self._m_area = self._root.nav_area_grid.GetNavAreaByID( self.area_id )
+        return self._m_area
 
     def __str__ (self: "NavConnect") -> str:
         return str( self.area_id )
@@ -508,14 +603,16 @@ class NavAreaGrid ():
     """
     @staticmethod
     def ComputeHashKey (id: int) -> int:
-        """Returns a hash key for the given nav area ID."""
-        return id & 0xFF
+        """Returns a hash key for the given nav area ID.
+        The whole ID, each slot only chains areas of the same ID.
+        """
+        return id
 
     def __init__(self) -> None:
         self.m_grid: list[list[NavAreaGridHash]] = []
         self.m_minX: float = 0.0
         self.m_minY: float = 0.0
-        self.m_hashTable: list[NavAreaGridHash|None] = [None,] * 256
+        self.m_hashTable = dict[int, NavAreaGridHash]()
         """Hash table to optimize lookup by ID."""
         self.Reset()
 
@@ -525,8 +622,7 @@ class NavAreaGrid ():
         self.m_gridSizeX: int = 0
         self.m_gridSizeY: int = 0
         # clear the hash table.
-        for k in range(len(self.m_hashTable)):
-            self.m_hashTable[k] = None
+        self.m_hashTable.clear()
         self._areaCount: int = 0
         """Total number of nav areas."""
 
@@ -559,7 +655,7 @@ class NavAreaGrid ():
 
         # add to hash table.
         key: int = self.ComputeHashKey( area.id )
-        if self.m_hashTable[key]:
+        if key in self.m_hashTable:
             # add to head of list in this slot.
             here_hash.m_prevHash = None
             here_hash.m_nextHash = self.m_hashTable[key]
@@ -597,9 +693,11 @@ class NavAreaGrid ():
             area_hash.m_prevHash.m_nextHash = area_hash.m_nextHash
         else:
             # area was at start of list.
-            self.m_hashTable[key] = area_hash.m_nextHash
-            if self.m_hashTable[key]:
+            if area_hash.m_nextHash:
+                self.m_hashTable[key] = area_hash.m_nextHash
                 self.m_hashTable[key].m_prevHash = None
+            else:
+                del self.m_hashTable[key]
         if area_hash.m_nextHash:
             area_hash.m_nextHash.m_prevHash = area_hash.m_prevHash
         self._areaCount -= 1
@@ -683,13 +781,7 @@ class NavAreaGrid ():
         if id == 0:
             return None
 
-        key: int = self.ComputeHashKey( id )
-        area_hash = self.m_hashTable[key]
-        while area_hash:
-            if area_hash.m_hereArea.id == id:
-                return area_hash
-            area_hash = area_hash.m_nextHash
-        return None
+        return self.m_hashTable.get( self.ComputeHashKey(id) )
 
     def load (self, areas: list[NavArea]) -> NavErrorType:
         lo = Vector.from_list([ 9999999999.9, 9999999999.9, 0 ])
@@ -718,5 +810,90 @@ class NavAreaGrid ():
         return NavErrorType.NAV_OK
 
 
-THE_NAV_AREA_GRID = NavAreaGrid()
-"""The singleton for accessing the grid."""
+def _compute_portal (src_ext, tgt_ext, dir: DirectionType) -> tuple[float, float, float]:
+    """`NavArea.ComputePortal` of two extents, `(center x, center y, half-width)`."""
+    if dir == DirectionType.north or dir == DirectionType.south:
+        if dir == DirectionType.north:
+            y = src_ext.lo.y
+        else:
+            y = src_ext.hi.y
+
+        left: float = max( src_ext.lo.x, tgt_ext.lo.x )
+        right: float = min( src_ext.hi.x, tgt_ext.hi.x )
+        # clamp to our extent in case areas are disjoint.
+        if left < src_ext.lo.x:
+            left = src_ext.lo.x
+        elif left > src_ext.hi.x:
+            left = src_ext.hi.x
+        if right < src_ext.lo.x:
+            right = src_ext.lo.x
+        elif right > src_ext.hi.x:
+            right = src_ext.hi.x
+        return ((left + right) / 2.0, y, (right - left) / 2.0)
+    # EAST or WEST.
+    if dir == DirectionType.west:
+        x = src_ext.lo.x
+    else:
+        x = src_ext.hi.x
+
+    top: float = max( src_ext.lo.y, tgt_ext.lo.y )
+    bottom: float = min( src_ext.hi.y, tgt_ext.hi.y )
+    # clamp to our extent in case areas are disjoint.
+    if top < src_ext.lo.y:
+        top = src_ext.lo.y
+    elif top > src_ext.hi.y:
+        top = src_ext.hi.y
+    if bottom < src_ext.lo.y:
+        bottom = src_ext.lo.y
+    elif bottom > src_ext.hi.y:
+        bottom = src_ext.hi.y
+    return (x, (top + bottom) / 2.0, (bottom - top) / 2.0)
+
+
+class NavMesh (NavCsczFile):
+    """A `.NAV` file, along with the state that the bot code kept global.
+
+    Parse files with `NavMesh.from_file()` so every map gets its own state.
+    Sections in `lazy_sections` are parsed on first access.
+    """
+    def __init__ (self, _io, _parent=None, _root=None, lazy_sections: tuple[str, ...] = ()):
+        self.lazy_sections = frozenset( lazy_sections )
+        """`NAV_LAZY_SECTIONS` that are not parsed yet."""
+        # Filled while parsing, so set them up first.
+        self.nav_area_grid = NavAreaGrid()
+        """The grid for accessing areas of this mesh."""
+        self.hiding_spots = list[HidingSpot]()
+        """List of hiding spots."""
+        self.hiding_spot_by_id = dict[int, HidingSpot]()
+        """Hiding spots indexed by their ID."""
+        super().__init__( _io, _parent, _root )
+
+    @classmethod
+    def from_file (cls, filename: str, lazy_sections: tuple[str, ...] = ()):
+        """Parse a file, it is kept open to parse lazy sections later."""
+        f = open( filename, 'rb' )
+        try:
+            return cls( KaitaiStream(f), lazy_sections=lazy_sections )
+        except Exception:
+            f.close()
+            raise
+
+    def load_section (self, name: str):
+        """Parse a lazy section of every area, then resolve its IDs."""
+        if name not in self.lazy_sections:
+            return
+        self.lazy_sections = self.lazy_sections - {name}
+        areas: list[NavArea] = self.nav_areas.entries
+        for area in areas:
+            getattr( area, name )._load()
+        for area in areas:
+            area.post_load_section( name )
+
+    def GetHidingSpotByID (self, id: int) -> HidingSpot | None:
+        """Given a HidingSpot ID, return the associated HidingSpot."""
+        self.load_section( "hiding_spots" )
+        return self.hiding_spot_by_id.get( id )
+
+    def GetNavAreaByID (self, id: int) -> NavArea | None:
+        """Given an ID, return the associated area."""
+        return self.nav_area_grid.GetNavAreaByID( id )
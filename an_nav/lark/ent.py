@@ -1,3 +1,6 @@
+from functools import cache
+import re
+from typing import Callable
 import lark
 from . import _MODULE_GRAMMARS
 
@@ -17,8 +20,86 @@ class EntTransformer (lark.Transformer):
 
 _GRAMMAR, _OPTIONS = _MODULE_GRAMMARS["ent"]
 _OPTIONS["transformer"] = EntTransformer()
-EntLark = lark.Lark( _GRAMMAR.open(), **_OPTIONS )
-"""Lark parser for `.ent` and `.bsp`'s entities lump."""
+_OPTIONS["cache"] = True
+
+
+@cache
+def get_ent_lark () -> lark.Lark:
+    """Lark parser for `.ent` and `.bsp`'s entities lump, also as `EntLark`.
+
+    Built on first use. The LALR tables are cached into the temp directory,
+    keyed by the grammar, the options, Lark & Python version.
+    """
+    return lark.Lark( _GRAMMAR.read_text(), **_OPTIONS )
+
+
+def __getattr__ (name: str):
+    if name == "EntLark":
+        return get_ent_lark()
+    raise AttributeError( f"module {__name__!r} has no attribute {name!r}" )
+
+
+class EntScanner ():
+    """Single pass parser for `.ent` and `.bsp`'s entities lump.
+
+    Gives the same blocks as `EntLark.parse`, strings are kept unescaped as-is.
+    """
+    _TOKEN = re.compile( r'[ \t\f\r\n]*(?:([{}])|"(.*?(?<!\\)(?:\\\\)*?)"|([^ \t\f\r\n]))' )
+    """Whitespace, then `{`/`}`, an `ESCAPED_STRING` or anything else."""
+
+    def parse (self, text: str) -> TRANSFORM_TYPE:
+        blocks = list[dict[str,str]]()
+        block: dict[str,str] = None
+        key: str = None
+        for i, (brace, string, bad) in enumerate( self._TOKEN.findall(text) ):
+            if bad:
+                self._raise( text, i, f"Unexpected character {bad!r}" )
+            elif brace == "{":
+                if block is not None:
+                    self._raise( text, i, "Unexpected '{'" )
+                block = {}
+            elif brace == "}":
+                if block is None or key is not None:
+                    self._raise( text, i, "Unexpected '}'" )
+                blocks.append( block )
+                block = None
+            elif block is None:
+                self._raise( text, i, "Unexpected string" )
+            elif key is None:
+                key = string
+            else:
+                block[key] = string
+                key = None
+        if block is not None:
+            raise ValueError( "Unexpected end of input, expected '}'" )
+        return blocks
+
+    def _raise (self, text: str, index: int, message: str):
+        for i, match in enumerate( self._TOKEN.finditer(text) ):
+            if i == index:
+                # Strings are captured without their opening quote.
+                pos = match.start( match.lastindex ) - (match.lastindex == 2)
+                line = text.count( "\n", 0, pos ) + 1
+                column = pos - text.rfind( "\n", 0, pos )
+                raise ValueError( f"{message}, at line {line} col {column}" )
+
+
+ENT_PARSERS = dict[str, Callable[[], EntScanner | lark.Lark]](
+    scanner=EntScanner
+    , lark=get_ent_lark
+)
+"""Available parsers for `parse_ent`, the first is the default."""
+
+
+def parse_ent (text: str, parser: str = None) -> TRANSFORM_TYPE:
+    """Parse entities text with the given `ENT_PARSERS`, default is the first."""
+    if parser is None:
+        parser = next( iter(ENT_PARSERS) )
+    result = ENT_PARSERS[parser]().parse( text )
+    # `?start` inlines a lone block.
+    if isinstance( result, dict ):
+        return [result]
+    return result
 
 
 def iter_ent (o: TRANSFORM_TYPE):
@@ -0,0 +1,255 @@
+"""Tile-parallel `info_node` build, over a process pool.
+
+Areas are grouped into tiles of `NavAreaGrid` cells. Workers build the
+candidates of each tile, and with the "cluster" merge engine, the clusters
+within the tile. Clusters meeting at tile seams are then joined here,
+the result is the same as `Nav2EntSession.iter_navarea_ent`.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from importlib.util import find_spec
+from os import cpu_count
+from .kaitai.nav import NavMesh, Vector, DirectionType, GRID_CELL_SIZE
+from .utils import (
+    InfoNodeEntity
+    , Nav2EntSession
+    , MERGE_ENGINES
+    , iter_node_cells
+    , iter_navarea_ent_portal
+    , iter_navarea_ent_encounter
+    , iter_navarea_ent_inside
+    , sample_navarea_ent_inside
+    , iter_sorted_nodes
+    , find_node_clusters
+    , build_node_clusters
+    , load_navmesh
+)
+
+
+
+PARALLEL_TILE_CELLS: int = 4
+"""Side of a tile, in `NavAreaGrid` cells."""
+
+CandidateKey = tuple[int, int, int]
+"""Area position, build flag position, index of the candidate within them."""
+
+_WORKER_MESHES = dict[str, tuple[NavMesh, dict[int, int]]]()
+"""`.NAV` path -> mesh of the worker, and entry index by area `id()`."""
+
+
+def _get_worker_mesh (nav_path: str, flags: str, nav_cache: str = None):
+    if nav_path not in _WORKER_MESHES:
+        _WORKER_MESHES.clear()
+        mesh = load_navmesh( nav_path, flags, nav_cache )
+        _WORKER_MESHES[nav_path] = (
+            mesh
+            , { id(x): k for k, x in enumerate(mesh.nav_areas.entries) }
+        )
+    return _WORKER_MESHES[nav_path]
+
+
+def _build_tile (
+    nav_path: str
+    , flags: str
+    , nav_cache: str
+    , batched: bool
+    , cluster: bool
+    , tasks: list[tuple[int, int, list[tuple[int, int]]]]
+):
+    """Candidates of the areas of a tile, as `(key, x, y, z, target entry index or -1)`,
+    and their clusters if `cluster`, as sorted candidate indices.
+
+    `tasks` are `(area position, entry index, unmarked connections)`,
+    connections as `(target entry index, direction)`.
+    """
+    mesh, index_of = _get_worker_mesh( nav_path, flags, nav_cache )
+    entries = mesh.nav_areas.entries
+    inside = None
+    if batched and "c" in flags:
+        inside = sample_navarea_ent_inside( [entries[k] for _, k, _ in tasks] )
+    nodes = list[InfoNodeEntity]()
+    keys = list[CandidateKey]()
+    for n, (i, k, links) in enumerate( tasks ):
+        source = entries[k]
+        for f, flag in enumerate( flags ):
+            if flag == "a":
+                candidates = (
+                    (target, origin)
+                    for t, dir in links
+                    for target, origin in iter_navarea_ent_portal( source, entries[t], DirectionType(dir) )
+                )
+            elif flag == "b":
+                candidates = ((target, origin) for target, origin, _ in iter_navarea_ent_encounter( source ))
+            elif flag == "c":
+                candidates = (
+                    (None, origin)
+                    for origin in (inside[n] if inside is not None else iter_navarea_ent_inside( source ))
+                )
+            else:
+                continue
+            for ordinal, (target, origin) in enumerate( candidates ):
+                nodes.append( InfoNodeEntity(source, origin, target) )
+                keys.append( (i, f, ordinal) )
+    candidates = [
+        (key, x.origin.x, x.origin.y, x.origin.z, index_of[id( x.target )] if x.target else -1)
+        for key, x in zip( keys, nodes )
+    ]
+    return (candidates, find_node_clusters( nodes ) if cluster else None)
+
+
+def build_navarea_ent_parallel (
+    session: Nav2EntSession
+    , nav_path: str
+    , flags: str = "c"
+    , merge: str = MERGE_ENGINES[0]
+    , jobs: int | None = None
+    , nav_cache: str = None
+    , batched: bool|None = None
+    , tile_cells: int = PARALLEL_TILE_CELLS
+) -> list[InfoNodeEntity]:
+    """Same `info_node`s as `session.iter_navarea_ent( flags=flags, merge=merge )`,
+    built over `jobs` worker(s), all cores if None.
+
+    `session.mesh` must be loaded from `nav_path`, that workers load too,
+    through the snapshots of `nav_cache` if given. Forked workers reuse it.
+    """
+    if merge not in MERGE_ENGINES:
+        raise ValueError( f"Unknown merge engine {merge}" )
+    mesh = session.mesh
+    entries = mesh.nav_areas.entries
+    index_of = { id(x): k for k, x in enumerate(entries) }
+    flags_clean = "".join( dict.fromkeys(flags.lower()) )
+    if batched is None:
+        batched = find_spec( "numpy" ) is not None
+
+    # Marks depend on the area order, walked here once for all tiles.
+    grid = mesh.nav_area_grid
+    tiles = dict[tuple[int, int], list[tuple[int, int, list[tuple[int, int]]]]]()
+    areas = session.filter_navarea_buildable( entries )
+    for i, area in enumerate( areas ):
+        links = [
+            (index_of[id( target )], dir.value)
+            for target, dir in session.iter_navarea_connect_unmarked( area )
+        ] if "a" in flags_clean else []
+        center = area.area_extent.ks_instances_center
+        tile = (grid.WorldToGridX( center.x ) // tile_cells, grid.WorldToGridY( center.y ) // tile_cells)
+        tiles.setdefault( tile, [] ).append( (i, index_of[id( area )], links) )
+
+    jobs = jobs or cpu_count() or 1
+    cluster = merge == "cluster"
+    build_tile = partial( _build_tile, nav_path, flags_clean, nav_cache, batched, cluster )
+    # Forked workers inherit the mesh as is, others load their own.
+    _WORKER_MESHES.clear()
+    _WORKER_MESHES[nav_path] = (mesh, index_of)
+    try:
+        with ProcessPoolExecutor( max_workers=jobs ) as pool:
+            results = list( pool.map(
+                build_tile
+                , tiles.values()
+                , chunksize=max( 1, len(tiles) // (jobs * 4) )
+            ) )
+    finally:
+        _WORKER_MESHES.clear()
+
+    # Global order of candidates, as built by a single session.
+    order = sorted(
+        (key, t, n)
+        for t, (candidates, _) in enumerate( results )
+        for n, (key, *_) in enumerate( candidates )
+    )
+    positions = [[0] * len(candidates) for candidates, _ in results]
+    nodes = list[InfoNodeEntity]()
+    for (i, _, _), t, n in order:
+        _, x, y, z, target = results[t][0][n]
+        positions[t][n] = len( nodes )
+        nodes.append( InfoNodeEntity(
+            areas[i]
+            , Vector.from_raw( x, y, z )
+            , entries[target] if target >= 0 else None
+        ) )
+
+    if not cluster:
+        for ent in nodes:
+            session.add_node( ent )
+        return list( iter_sorted_nodes(session.nodes) )
+    clusters = [
+        (t, [positions[t][n] for n in members])
+        for t, (_, tile_clusters) in enumerate( results )
+        for members in tile_clusters
+    ]
+    clusters = join_seam_clusters( nodes, clusters, tile_cells * GRID_CELL_SIZE )
+    return list( iter_sorted_nodes(build_node_clusters(nodes, clusters)) )
+
+
+def join_seam_clusters (
+    nodes: list[InfoNodeEntity]
+    , clusters: list[tuple[int, list[int]]]
+    , cell_size: float
+) -> list[list[int]]:
+    """Join clusters of different tiles whose nodes overlap, into `find_node_clusters` ones.
+
+    `clusters` are `(tile, sorted node indices)`, complete within each tile.
+    Only nodes of clusters whose AABB meets one of another tile are compared.
+    """
+    parent = list( range(len(clusters)) )
+    def find (i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    bounds = list[tuple[Vector, Vector]]()
+    for _, members in clusters:
+        lo = nodes[members[0]].absmin.copy()
+        hi = nodes[members[0]].absmax.copy()
+        for i in members[1:]:
+            node = nodes[i]
+            lo.x, lo.y, lo.z = min( lo.x, node.absmin.x ), min( lo.y, node.absmin.y ), min( lo.z, node.absmin.z )
+            hi.x, hi.y, hi.z = max( hi.x, node.absmax.x ), max( hi.y, node.absmax.y ), max( hi.z, node.absmax.z )
+        bounds.append( (lo, hi) )
+
+    # Broad-phase between clusters.
+    seams = set[int]()
+    cells = dict[tuple[int, int], list[int]]()
+    for c, (lo, hi) in enumerate( bounds ):
+        seen = set[int]()
+        for cell in iter_node_cells( lo, hi, cell_size ):
+            bucket = cells.setdefault( cell, [] )
+            for d in bucket:
+                if d in seen or clusters[d][0] == clusters[c][0]:
+                    continue
+                seen.add( d )
+                other_lo, other_hi = bounds[d]
+                if (
+                    other_lo.x > hi.x or other_lo.y > hi.y or other_lo.z > hi.z
+                    or other_hi.x < lo.x or other_hi.y < lo.y or other_hi.z < lo.z
+                ):
+                    continue
+                seams.update( (c, d) )
+            bucket.append( c )
+
+    # Narrow-phase between nodes of those clusters.
+    cells.clear()
+    owner = dict[int, int]()
+    for c in sorted( seams ):
+        for i in clusters[c][1]:
+            owner[i] = c
+    for i, c in owner.items():
+        node = nodes[i]
+        seen = set[int]()
+        for cell in iter_node_cells( node.absmin, node.absmax ):
+            bucket = cells.setdefault( cell, [] )
+            for j in bucket:
+                d = owner[j]
+                if j in seen or clusters[d][0] == clusters[c][0]:
+                    continue
+                seen.add( j )
+                root, other = find( c ), find( d )
+                if root != other and nodes[j].is_intersects( node ):
+                    parent[max( root, other )] = min( root, other )
+            bucket.append( i )
+
+    joined = dict[int, list[int]]()
+    for c, (_, members) in enumerate( clusters ):
+        joined.setdefault( find(c), [] ).extend( members )
+    return [sorted( x ) for x in joined.values()]
@@ -0,0 +1,361 @@
+"""Compact on-disk snapshot of a loaded nav mesh, to skip parsing unchanged `.NAV` files.
+
+A snapshot is a header followed by flat little-endian columns, 8 bytes aligned,
+laid out like `arrays.NavAreaArrays` so they can be used straight from `mmap`.
+Hiding spots, approach areas and encounter spot orders are not kept.
+
+Only `NavSnapshot.to_arrays` is zero-copy. `NavSnapshot.to_mesh` still builds
+every area, connection & vector, it saves the parsing, the grid & ID resolution.
+"""
+from array import array
+from dataclasses import dataclass
+import gc
+from hashlib import sha256
+import mmap
+import os
+import pathlib
+from struct import Struct
+import sys
+from .kaitai.nav import (
+    NavMesh
+    , NavArea
+    , NavAreaList
+    , NavAreaGrid
+    , NavAreaAttributeFlags
+    , NavConnectList
+    , NavConnect
+    , HidingSpotList
+    , ApproachInfoList
+    , EncounterSpotList
+    , EncounterSpot
+    , EncounterSpotArea
+    , Extent
+    , Place
+    , PlaceList
+    , Ray
+    , Vector
+    , DirectionType
+    , NUM_DIRECTIONS
+)
+
+
+
+SNAPSHOT_MAGIC = b"N2EM"
+SNAPSHOT_VERSION = 1
+"""Bump on any layout change, older snapshots are then ignored."""
+SNAPSHOT_SUFFIX = ".navsnap"
+
+_HEADER = Struct( "<4sIIQ32sIIII" )
+"""Magic, snapshot version, NAV version, NAV size, NAV SHA-256,
+area count, connection count, encounter spot count, place names size.
+"""
+
+
+@dataclass( frozen=True, slots=True )
+class SnapshotKey ():
+    """Identity of a `.NAV` file content."""
+    digest: bytes
+    size: int
+
+    @classmethod
+    def from_file (cls, path: str):
+        with open( path, "rb" ) as fp:
+            digest = sha256()
+            size = 0
+            while chunk := fp.read( 1 << 20 ):
+                digest.update( chunk )
+                size += len( chunk )
+        return cls( digest.digest(), size )
+
+    def filename (self) -> str:
+        return f"{self.digest.hex()}-{self.size}{SNAPSHOT_SUFFIX}"
+
+
+def _iter_columns (n: int, m: int, e: int, p: int):
+    """Yield `(name, typecode, length)` of each column, in file order."""
+    yield ("ids", "I", n)
+    yield ("lo", "f", n * 3)
+    yield ("hi", "f", n * 3)
+    yield ("corner_northeast_z", "f", n)
+    yield ("corner_southwest_z", "f", n)
+    yield ("attribute_flags", "B", n)
+    yield ("place_ids", "H", n)
+    # Per direction, relative to the first connection of that direction.
+    yield ("adjacent_offsets", "q", NUM_DIRECTIONS * (n + 1))
+    yield ("adjacent_index", "i", m)
+    yield ("adjacent_ids", "I", m)
+    yield ("encounter_offsets", "q", n + 1)
+    # Source & target of each spot.
+    yield ("encounter_index", "i", e * 2)
+    yield ("encounter_ids", "I", e * 2)
+    yield ("encounter_directions", "B", e * 2)
+    yield ("encounter_paths", "d", e * 6)
+    # NUL terminated names.
+    yield ("places", "B", p)
+
+
+def _iter_layout (n: int, m: int, e: int, p: int):
+    """Yield `(name, typecode, offset, length)` of each column."""
+    offset = _HEADER.size
+    for name, typecode, length in _iter_columns( n, m, e, p ):
+        offset = (offset + 7) & ~7
+        yield (name, typecode, offset, length)
+        offset += length * array( typecode ).itemsize
+
+
+def write_snapshot (mesh: NavMesh, path: str | pathlib.Path, key: SnapshotKey):
+    """Write a snapshot of a loaded mesh, after its `PostLoad`."""
+    if sys.byteorder != "little":
+        raise NotImplementedError( "Snapshot requires a little-endian machine" )
+    mesh.load_section( "encounter_spots" )
+    areas: list[NavArea] = mesh.nav_areas.entries
+    row_of = dict[int, int]( (id(x), k) for k,x in enumerate(areas) )
+    places = mesh.places.entries if mesh.ks_instances_can_has_places else []
+    columns = dict[str, array](
+        (name, array(typecode))
+        for name, typecode, _ in _iter_columns( 0, 0, 0, 0 )
+    )
+    for area in areas:
+        columns["ids"].append( area.id )
+        columns["lo"].extend( area.area_extent.lo )
+        columns["hi"].extend( area.area_extent.hi )
+        columns["corner_northeast_z"].append( area.corner_northeast_z )
+        columns["corner_southwest_z"].append( area.corner_southwest_z )
+        columns["attribute_flags"].append( area._raw_attribute_flags[0] )
+        columns["place_ids"].append( getattr(area, "place_id", 0) )
+    for d in range( NUM_DIRECTIONS ):
+        start = len( columns["adjacent_index"] )
+        columns["adjacent_offsets"].append( 0 )
+        for area in areas:
+            for connect in area.area_adjacents_per_directions[d].entries:
+                columns["adjacent_index"].append( row_of.get(id(connect.area), -1) )
+                columns["adjacent_ids"].append( connect.area_id )
+            columns["adjacent_offsets"].append( len(columns["adjacent_index"]) - start )
+    columns["encounter_offsets"].append( 0 )
+    for area in areas:
+        # Legacy spots are old data, read and discarded.
+        if not area.encounter_spots.ks_instances_is_legacy:
+            for spot in area.encounter_spots.entries:
+                spot: EncounterSpot = spot
+                for end in (spot.source, spot.target):
+                    columns["encounter_index"].append( row_of.get(id(end.area_connection.area), -1) )
+                    columns["encounter_ids"].append( end.area_connection.area_id )
+                    columns["encounter_directions"].append( end.direction.value )
+                columns["encounter_paths"].extend( spot.path.source )
+                columns["encounter_paths"].extend( spot.path.target )
+        columns["encounter_offsets"].append( len(columns["encounter_paths"]) // 6 )
+    columns["places"].frombytes( b"".join(str(x).encode("ascii") + b"\0" for x in places) )
+
+    counts = (
+        len( areas )
+        , len( columns["adjacent_ids"] )
+        , len( columns["encounter_paths"] ) // 6
+        , len( columns["places"] )
+    )
+    path = pathlib.Path( path )
+    temp_path = path.with_name( f"{path.name}.{os.getpid()}.tmp" )
+    with temp_path.open( "wb" ) as fp:
+        fp.write( _HEADER.pack(
+            SNAPSHOT_MAGIC
+            , SNAPSHOT_VERSION
+            , mesh.version
+            , key.size
+            , key.digest
+            , *counts
+        ) )
+        for name, _, offset, _ in _iter_layout( *counts ):
+            fp.write( bytes(offset - fp.tell()) )
+            columns[name].tofile( fp )
+    # Readers never see a partial snapshot.
+    os.replace( temp_path, path )
+
+
+class NavSnapshot ():
+    """A memory-mapped snapshot, columns are `memoryview`s of the file."""
+    def __init__ (self, buf: mmap.mmap, header: tuple):
+        self._buf = buf
+        (_, _, self.version, _, _, *counts) = header
+        self.columns = dict[str, memoryview]()
+        view = memoryview( buf )
+        for name, typecode, offset, length in _iter_layout( *counts ):
+            size = length * array( typecode ).itemsize
+            self.columns[name] = view[offset:offset + size].cast( typecode )
+        self.places = tuple(
+            x.decode("ascii")
+            for x in bytes(self.columns["places"]).split(b"\0")[:-1]
+        )
+
+    @classmethod
+    def open (cls, path: str | pathlib.Path, key: SnapshotKey):
+        """Map a snapshot, None if missing, outdated or not of the given NAV."""
+        if sys.byteorder != "little":
+            return None
+        try:
+            with open( path, "rb" ) as fp:
+                buf = mmap.mmap( fp.fileno(), 0, access=mmap.ACCESS_READ )
+        except (OSError, ValueError):
+            return None
+        header = cls._check( buf, key )
+        if header is None:
+            # Unmapped right away, or the file stays locked on Windows.
+            buf.close()
+            return None
+        return cls( buf, header )
+
+    @staticmethod
+    def _check (buf: mmap.mmap, key: SnapshotKey) -> tuple | None:
+        """Header of the snapshot, None if it is not a complete one of the given NAV."""
+        if len(buf) < _HEADER.size:
+            return None
+        header = _HEADER.unpack_from( buf )
+        (magic, version, _, size, digest, *counts) = header
+        if (
+            magic != SNAPSHOT_MAGIC
+            or version != SNAPSHOT_VERSION
+            or size != key.size
+            or digest != key.digest
+        ):
+            return None
+        *_, (_, typecode, offset, length) = _iter_layout( *counts )
+        if len(buf) < offset + length * array( typecode ).itemsize:
+            return None
+        return header
+
+    def __len__ (self) -> int:
+        return len( self.columns["ids"] )
+
+    def to_arrays (self):
+        """Zero-copy `arrays.NavAreaArrays` of the snapshot, requires NumPy."""
+        import numpy as np
+        from .arrays import NavAreaArrays
+        n = len( self )
+        col = lambda name, dtype: np.frombuffer( self.columns[name], dtype=dtype )
+        offsets = col( "adjacent_offsets", np.int64 ).reshape( NUM_DIRECTIONS, n + 1 )
+        index = col( "adjacent_index", np.int32 )
+        starts = np.concatenate(( [0], np.cumsum(offsets[:,-1]) ))
+        return NavAreaArrays(
+            col( "ids", np.uint32 )
+            , col( "lo", np.float32 ).reshape( n, 3 )
+            , col( "hi", np.float32 ).reshape( n, 3 )
+            , col( "corner_northeast_z", np.float32 )
+            , col( "corner_southwest_z", np.float32 )
+            , col( "attribute_flags", np.uint8 )
+            , col( "place_ids", np.uint16 )
+            , self.places
+            , tuple( offsets[d] for d in range(NUM_DIRECTIONS) )
+            , tuple( index[starts[d]:starts[d+1]] for d in range(NUM_DIRECTIONS) )
+        )
+
+    def to_mesh (self) -> NavMesh:
+        """Rebuild a `NavMesh` with its areas connected, without parsing the `.NAV`."""
+        # Nothing to collect while building, but lots to scan.
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return self._to_mesh()
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+    def _to_mesh (self) -> NavMesh:
+        c = self.columns
+        n = len( self )
+        mesh = _new( NavMesh, None, None )
+        mesh._root = mesh
+        mesh.version = self.version
+        mesh.lazy_sections = frozenset()
+        mesh.nav_area_grid = NavAreaGrid()
+        mesh.hiding_spots = []
+        mesh.hiding_spot_by_id = {}
+        mesh.places = _new( PlaceList, mesh, mesh, count=len(self.places) )
+        mesh.places.entries = [ _new(Place, mesh.places, mesh, name=x) for x in self.places ]
+        mesh.nav_areas = _new( NavAreaList, mesh, mesh, count=n )
+
+        areas = list[NavArea]()
+        for i in range( n ):
+            area = _new(
+                NavArea, mesh.nav_areas, mesh
+                , id=c["ids"][i]
+                , _raw_attribute_flags=bytes(( c["attribute_flags"][i], ))
+                , corner_northeast_z=c["corner_northeast_z"][i]
+                , corner_southwest_z=c["corner_southwest_z"][i]
+                , area_adjacents_per_directions=[]
+            )
+            flags = c["attribute_flags"][i]
+            area.attribute_flags = _new(
+                NavAreaAttributeFlags, area, mesh
+                , crouch=bool(flags & 0x01)
+                , jump=bool(flags & 0x02)
+                , precise=bool(flags & 0x04)
+                , no_jump=bool(flags & 0x08)
+            )
+            area.area_extent = _new(
+                Extent, area, mesh
+                , lo=Vector( *c["lo"][i*3:i*3+3] )
+                , hi=Vector( *c["hi"][i*3:i*3+3] )
+            )
+            if mesh.ks_instances_can_has_places:
+                area.place_id = c["place_ids"][i]
+            area.hiding_spots = _new( HidingSpotList, area, mesh, count=0, entries=[] )
+            area.approach_areas = _new( ApproachInfoList, area, mesh, count=0, entries=[] )
+            areas.append( area )
+        mesh.nav_areas.entries = areas
+
+        start = 0
+        for d in range( NUM_DIRECTIONS ):
+            offsets = c["adjacent_offsets"][d*(n+1):(d+1)*(n+1)]
+            for i, area in enumerate( areas ):
+                connects = _new( NavConnectList, area, mesh, ks_params_index=d )
+                connects.entries = [
+                    _new(
+                        NavConnect, connects, mesh
+                        , area_id=c["adjacent_ids"][k]
+                        , _m_area=_row( areas, c["adjacent_index"][k] )
+                    )
+                    for k in range( start + offsets[i], start + offsets[i+1] )
+                ]
+                connects.count = len( connects.entries )
+                area.area_adjacents_per_directions.append( connects )
+            start += offsets[n]
+
+        for i, area in enumerate( areas ):
+            spots = _new( EncounterSpotList, area, mesh, entries=[] )
+            for k in range( c["encounter_offsets"][i], c["encounter_offsets"][i+1] ):
+                spot = _new( EncounterSpot, spots, mesh, spots_count=0, spots=[] )
+                for end, j in (("source", k*2), ("target", k*2+1)):
+                    connect = _new(
+                        NavConnect, None, mesh
+                        , area_id=c["encounter_ids"][j]
+                        , _m_area=_row( areas, c["encounter_index"][j] )
+                    )
+                    setattr( spot, end, _new(
+                        EncounterSpotArea, spot, mesh
+                        , area_connection=connect
+                        , direction=DirectionType( c["encounter_directions"][j] )
+                    ) )
+                    connect._parent = getattr( spot, end )
+                spot.path = Ray.from_list( [Vector(), Vector()], spot, mesh )
+                # Z is not rounded, keep it as is.
+                (spot.path.source.x, spot.path.source.y, spot.path.source.z
+                , spot.path.target.x, spot.path.target.y, spot.path.target.z
+                ) = c["encounter_paths"][k*6:k*6+6]
+                spots.entries.append( spot )
+            spots.count = len( spots.entries )
+            area.encounter_spots = spots
+
+        mesh.nav_area_grid.load( areas )
+        return mesh
+
+
+def _new (cls: type, _parent, _root, **attrs):
+    """Instance of a Kaitai struct class, with given fields instead of parsing."""
+    self = cls.__new__( cls )
+    self._io = None
+    self._parent = _parent
+    self._root = _root
+    self.__dict__.update( attrs )
+    return self
+
+
+def _row (areas: list[NavArea], row: int) -> NavArea | None:
+    return areas[row] if row >= 0 else None
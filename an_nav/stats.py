@@ -0,0 +1,102 @@
+"""Per-stage timing & counters of the conversion pipeline."""
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, asdict
+import gc
+import sys
+import time
+
+
+
+@dataclass( slots=True )
+class StageStats ():
+    """Totals of one pipeline stage, over all of its runs."""
+    wall: float = 0.0
+    """Wall time, in second(s)."""
+    cpu: float = 0.0
+    """CPU time of this process, in second(s)."""
+    blocks: int = 0
+    """Net memory blocks allocated, see `sys.getallocatedblocks`."""
+    collections: int = 0
+    """Garbage collector runs, all generations."""
+    calls: int = 0
+
+
+def _gc_collections () -> int:
+    return sum( x["collections"] for x in gc.get_stats() )
+
+
+@dataclass( slots=True )
+class PipelineStats ():
+    """Stages & counters of converting one map, filled by the pipeline as it runs.
+
+    Stages are named like `nav.parse` or `candidates.a`, see `STAGES`.
+    """
+    stages: dict[str, StageStats] = field( default_factory=dict )
+    counters: dict[str, int] = field( default_factory=dict )
+
+    @contextmanager
+    def stage (self, name: str):
+        """Add the time & allocations of the block to the stage `name`."""
+        blocks = sys.getallocatedblocks()
+        collections = _gc_collections()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            result = self.stages.get( name )
+            if result is None:
+                result = self.stages[name] = StageStats()
+            result.wall += wall
+            result.cpu += cpu
+            result.blocks += sys.getallocatedblocks() - blocks
+            result.collections += _gc_collections() - collections
+            result.calls += 1
+
+    def count (self, name: str, value: int = 1):
+        """Add to the counter `name`."""
+        self.counters[name] = self.counters.get( name, 0 ) + value
+
+    def maximum (self, name: str, value: int):
+        """Keep the highest value of the counter `name`."""
+        if value > self.counters.get( name, value - 1 ):
+            self.counters[name] = value
+
+    def to_dict (self) -> dict:
+        return asdict( self )
+
+
+STAGES = dict[str, str]({
+    "nav.snapshot": "Load or write the `.NAV` snapshot, see `--nav-cache`"
+    , "nav.parse": "Parse `.NAV`"
+    , "nav.grid": "Build the area grid"
+    , "nav.post_load": "`NavArea.PostLoad` of every area"
+    , "entities.parse": "Read & parse the BSP entities lump"
+    , "prune": "Find nav islands to leave out, see `--min-island` & `--spawn-reachable`"
+    , "candidates.a": "Build flag a candidates"
+    , "candidates.b": "Build flag b candidates"
+    , "candidates.c": "Build flag c candidates"
+    , "build": "Candidates & merge of the tiled or incremental builds"
+    , "merge": "Merge candidates into `info_node`s"
+    , "sort": "Sort `info_node`s by place & ID"
+    , "thin": "Thin `info_node`s to the budget, see `--max-nodes`"
+    , "write": "Format & write `.ent`"
+    , "graph": "Build & write the node graph, see `--node-graph`"
+})
+"""Stage name -> description."""
+COUNTERS = dict[str, str]({
+    "candidates": "Candidates built, all build flags"
+    , "merges": "Nodes merged into another"
+    , "add_node_depth": "Deepest recursion of `Nav2EntSession.add_node`"
+    , "intersect_tests": "AABB intersection tests of merging"
+    , "thinned": "`info_node`s dropped to fit `--max-nodes`"
+    , "pruned_areas": "Areas of nav islands left out, see `--min-island` & `--spawn-reachable`"
+})
+"""Counter name -> description."""
+
+
+def stage (stats: PipelineStats | None, name: str):
+    """`stats.stage( name )`, nothing if `stats` is None."""
+    return nullcontext() if stats is None else stats.stage( name )
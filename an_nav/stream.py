@@ -0,0 +1,272 @@
+"""Streaming `info_node` build, tile by tile, for the "cluster" merge engine.
+
+Areas are built per square tile of the map. A cluster of candidates is final
+once no area left to build can reach it, it is then formatted and spilled
+into a temporary file. The `.ent` order is restored by merging the spilled
+runs, the result is the same as `Nav2EntSession.iter_navarea_ent`.
+"""
+from heapq import merge
+from itertools import count
+from importlib.util import find_spec
+from math import floor
+import mmap
+import pickle
+from struct import Struct
+import tempfile
+from .kaitai.nav import NavArea
+from .utils import (
+    InfoNodeEntity
+    , Nav2EntSession
+    , NAVAREA_PORTAL_OFFSET
+    , ENTITY_HULL_DEFAULT_MIN
+    , ENTITY_HULL_DEFAULT_MAX
+    , iter_node_cells
+    , iter_navarea_ent_portal
+    , iter_navarea_ent_encounter
+    , iter_navarea_ent_inside
+    , sample_navarea_ent_inside
+)
+
+
+
+STREAM_TILE_SIZE: float = 1024.0
+"""Size of a tile, in world units."""
+STREAM_REACH_MARGIN: float = 1.0
+"""Slack around where an area can put its candidates, for float rounding."""
+
+NodeSortKey = tuple[str, tuple[int, ...], tuple[int, int, int]]
+"""Place, IDs, then the order of the node before sorting, see `iter_sorted_nodes`."""
+
+
+def get_navarea_reach (area: NavArea, flags: str, links: list) -> tuple[float, float, float, float] | None:
+    """XY rectangle holding the AABB of every candidate of the area, None if it has none.
+
+    `links` are the unmarked connections of the area, for flag "a".
+    """
+    xs = list[float]()
+    ys = list[float]()
+    margin = STREAM_REACH_MARGIN
+    ext = area.area_extent
+    if "c" in flags:
+        xs += (ext.lo.x, ext.hi.x)
+        ys += (ext.lo.y, ext.hi.y)
+    if "a" in flags and links:
+        # Portals are on the source edge, then closest to the target.
+        margin += NAVAREA_PORTAL_OFFSET
+        xs += (ext.lo.x, ext.hi.x)
+        ys += (ext.lo.y, ext.hi.y)
+        for target, _ in links:
+            xs += (target.area_extent.lo.x, target.area_extent.hi.x)
+            ys += (target.area_extent.lo.y, target.area_extent.hi.y)
+    if "b" in flags:
+        for spot in area.encounter_spots.entries:
+            xs += (spot.path.source.x, spot.path.target.x)
+            ys += (spot.path.source.y, spot.path.target.y)
+    if not xs:
+        return None
+    lo, hi = ENTITY_HULL_DEFAULT_MIN, ENTITY_HULL_DEFAULT_MAX
+    margin += max( -lo.x, -lo.y, hi.x, hi.y )
+    return (min( xs ) - margin, min( ys ) - margin, max( xs ) + margin, max( ys ) + margin)
+
+
+def _iter_tiles (rect: tuple[float, float, float, float], size: float):
+    for x in range( floor(rect[0] / size), floor(rect[2] / size) + 1 ):
+        for y in range( floor(rect[1] / size), floor(rect[3] / size) + 1 ):
+            yield (x, y)
+
+
+def iter_navarea_ent_tiles (
+    session: Nav2EntSession
+    , flags: str = "c"
+    , batched: bool|None = None
+    , tile_size: float = STREAM_TILE_SIZE
+):
+    """Build the nodes of `session.iter_navarea_ent( flags=flags, merge="cluster" )`, tile by tile.
+
+    Yield, after each tile, the list of `(sort key, merged node)` that became final.
+    Sorting all of them by key gives the order of `iter_sorted_nodes`.
+    """
+    areas = session.filter_navarea_buildable()
+    flags_clean = "".join( dict.fromkeys(flags.lower()) )
+    if batched is None:
+        batched = find_spec( "numpy" ) is not None
+
+    # Marks depend on the area order, walked once before the tiles.
+    links = [
+        list( session.iter_navarea_connect_unmarked(x) ) if "a" in flags_clean else []
+        for x in areas
+    ]
+    # Unbuilt areas reaching each tile.
+    pending = dict[tuple[int, int], int]()
+    reaches = list[tuple[float, float, float, float] | None]()
+    tiles = dict[tuple[int, int], list[int]]()
+    for i, area in enumerate( areas ):
+        reach = get_navarea_reach( area, flags_clean, links[i] )
+        reaches.append( reach )
+        if reach is None:
+            continue
+        for tile in _iter_tiles( reach, tile_size ):
+            pending[tile] = pending.get( tile, 0 ) + 1
+        ext = area.area_extent
+        center = ((ext.lo.x + ext.hi.x) / 2.0, (ext.lo.y + ext.hi.y) / 2.0)
+        tiles.setdefault( (floor(center[0] / tile_size), floor(center[1] / tile_size)), [] ).append( i )
+
+    # Open candidates, by sequence number.
+    sequence = count()
+    nodes = dict[int, InfoNodeEntity]()
+    keys = dict[int, tuple[int, int, int]]()
+    parent = dict[int, int]()
+    members = dict[int, list[int]]()
+    bounds = dict[int, list[float]]()
+    cells = dict[tuple[int, int], set[int]]()
+    blocked = dict[int, tuple[int, int]]()
+    def find (i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def add (ent: InfoNodeEntity, key: tuple[int, int, int]):
+        i = next( sequence )
+        nodes[i] = ent
+        keys[i] = key
+        parent[i] = i
+        members[i] = [i]
+        bounds[i] = [ent.absmin.x, ent.absmin.y, ent.absmax.x, ent.absmax.y]
+        root = i
+        seen = set[int]()
+        for cell in iter_node_cells( ent.absmin, ent.absmax ):
+            bucket = cells.setdefault( cell, set() )
+            for j in bucket:
+                if j in seen:
+                    continue
+                seen.add( j )
+                if not nodes[j].is_intersects( ent ):
+                    continue
+                other = find( j )
+                if other == root:
+                    continue
+                if len(members[other]) < len(members[root]):
+                    root, other = other, root
+                # `root` is the bigger one.
+                parent[other] = root
+                members[root] += members.pop( other )
+                blocked.pop( other, None )
+                a, b = bounds[root], bounds.pop( other )
+                bounds[root] = [min( a[0], b[0] ), min( a[1], b[1] ), max( a[2], b[2] ), max( a[3], b[3] )]
+            bucket.add( i )
+
+    for tile in sorted( tiles ):
+        tile_areas = tiles[tile]
+        inside = None
+        if batched and "c" in flags_clean:
+            inside = sample_navarea_ent_inside( [areas[i] for i in tile_areas] )
+        for k, i in enumerate( tile_areas ):
+            source = areas[i]
+            for f, flag in enumerate( flags_clean ):
+                ordinal = 0
+                if flag == "a":
+                    candidates = (
+                        (target, origin)
+                        for link in links[i]
+                        for target, origin in iter_navarea_ent_portal( source, *link )
+                    )
+                elif flag == "b":
+                    candidates = ((target, origin) for target, origin, _ in iter_navarea_ent_encounter( source ))
+                elif flag == "c":
+                    candidates = (
+                        (None, origin)
+                        for origin in (inside[k] if inside is not None else iter_navarea_ent_inside( source ))
+                    )
+                else:
+                    continue
+                for target, origin in candidates:
+                    add( InfoNodeEntity(source, origin, target), (i, f, ordinal) )
+                    ordinal += 1
+            for reach_tile in _iter_tiles( reaches[i], tile_size ):
+                pending[reach_tile] -= 1
+
+        done = list[tuple[NodeSortKey, InfoNodeEntity]]()
+        for root in list( members ):
+            # Mostly still blocked by the same tile.
+            if pending.get( blocked.get(root), 0 ):
+                continue
+            blocker = next( (x for x in _iter_tiles(bounds[root], tile_size) if pending.get(x, 0)), None )
+            if blocker is not None:
+                blocked[root] = blocker
+                continue
+            blocked.pop( root, None )
+            cluster = sorted( members.pop(root), key=keys.__getitem__ )
+            del bounds[root]
+            first = nodes[cluster[0]]
+            if len(cluster) == 1:
+                ent, order = first, keys[cluster[0]]
+            else:
+                ent = type( first )(
+                    None
+                    , first.origin
+                    , merged_nodes=set( nodes[i] for i in cluster )
+                )
+                order = keys[cluster[1]]
+            if not ent.is_valid():
+                raise RuntimeError( "Corrupted info_node", ent )
+            done.append((
+                (ent.get_place(), tuple( int(v) for v in ent.get_id().split(";") ), order)
+                , ent
+            ))
+            for i in cluster:
+                node = nodes.pop( i )
+                for cell in iter_node_cells( node.absmin, node.absmax ):
+                    bucket = cells[cell]
+                    bucket.discard( i )
+                    if not bucket:
+                        del cells[cell]
+                del keys[i], parent[i]
+        yield done
+    if members:
+        raise RuntimeError( "info_node left unfinished", len(members) )
+
+
+class NodeSpill ():
+    """Sorted runs of formatted `info_node`s, in an anonymous temporary file."""
+    _RECORD = Struct( "<I" )
+    """Size of the pickled record that follows."""
+
+    def __init__ (self, dir: str = None):
+        self.fp = tempfile.TemporaryFile( dir=dir )
+        self.runs = list[tuple[int, int]]()
+
+    def __enter__ (self):
+        return self
+
+    def __exit__ (self, *args):
+        self.fp.close()
+
+    def add_run (self, records: list[tuple]):
+        """Spill records, sorted by their first item."""
+        if not records:
+            return
+        start = self.fp.tell()
+        for record in sorted( records, key=lambda x:x[0] ):
+            data = pickle.dumps( record, protocol=pickle.HIGHEST_PROTOCOL )
+            self.fp.write( self._RECORD.pack(len(data)) )
+            self.fp.write( data )
+        self.runs.append( (start, self.fp.tell()) )
+
+    def __iter__ (self):
+        """Yield every record spilled, sorted by their first item."""
+        if not self.runs:
+            return
+        self.fp.flush()
+        with mmap.mmap( self.fp.fileno(), 0, access=mmap.ACCESS_READ ) as buf:
+            yield from merge(
+                *(self._iter_run( buf, start, end ) for start, end in self.runs)
+                , key=lambda x:x[0]
+            )
+
+    def _iter_run (self, buf: mmap.mmap, start: int, end: int):
+        while start < end:
+            (size,) = self._RECORD.unpack_from( buf, start )
+            start += self._RECORD.size
+            yield pickle.loads( buf[start:start + size] )
+            start += size
@@ -0,0 +1,231 @@
+"""Synthetic `.NAV` & `.BSP` generator, for tests & benchmarks without real maps.
+
+Files are written field by field in the layout of `nav_cscz.ksy` and
+`bsp_basic.ksy`, for every `.NAV` version. The same parameters & seed
+always give the same bytes.
+"""
+import argparse
+from dataclasses import dataclass, fields
+from math import ceil, sqrt
+import pathlib
+import random
+from struct import Struct
+
+
+
+_U1 = Struct( "<B" )
+_U2 = Struct( "<H" )
+_U4 = Struct( "<I" )
+_F4 = Struct( "<f" )
+_VECTOR = Struct( "<3f" )
+_BSP_HEADER = Struct( "<i30i" )
+BSP_LUMP_COUNT = 15
+NAV_MAGIC_NUMBER = 0xFEEDFACE
+NAV_VERSIONS = ( 1, 2, 3, 4, 5 )
+
+SYNTH_CELL_SIZES = ( 12.5, 25.0, 30.0, 37.5, 50.0, 75.0, 100.0, 150.0, 250.0, 400.0, 450.0 )
+"""Widths of grid columns & rows, in world units."""
+SYNTH_PLACES = ( "BombsiteA", "BombsiteB", "Middle", "CTSpawn", "TSpawn" )
+SYNTH_CLASSNAMES = ( "info_player_start", "info_player_deathmatch", "light", "ambient_generic" )
+
+
+@dataclass( frozen=True, slots=True )
+class SynthParams ():
+    """Shape of a synthetic map."""
+    areas: int = 1000
+    """Area count."""
+    version: int = 5
+    """`.NAV` version, one of `NAV_VERSIONS`."""
+    density: float = 0.85
+    """Part of the grid cells that have an area, the grid is sized after it."""
+    connectivity: float = 0.95
+    """Chance of an area to connect to each of its neighbours."""
+    encounter_spots: int = 3
+    """Highest encounter spot count of an area, 0 to 3 per area by default."""
+    hiding_spots: int = 3
+    """Highest hiding spot count of an area."""
+    approach_areas: int = 2
+    """Highest approach area count of an area."""
+    ignorable: float = 0.08
+    """Chance of an area to be crouch or jump only."""
+    entities: int = 30
+    """BSP entity count, besides `worldspawn` & an old `info_node`."""
+    seed: int = 0
+
+
+def _height (rnd: random.Random, x: float, y: float) -> float:
+    """Gentle slope, with steps & a little noise."""
+    step = 20.0 if (int(x) // 700 + int(y) // 900) % 2 else 0.0
+    return x * 0.05 + y * 0.03 + step + rnd.random() * 3.0
+
+
+def build_nav (params: SynthParams, bsp_size: int = 0) -> bytes:
+    """`.NAV` file content."""
+    if params.version not in NAV_VERSIONS:
+        raise ValueError( f"Unknown NAV version {params.version}" )
+    rnd = random.Random( params.seed )
+    side = max( 1, ceil(sqrt( params.areas / params.density )) )
+    xs = [0.0]
+    ys = [0.0]
+    for _ in range( side ):
+        xs.append( xs[-1] + rnd.choice(SYNTH_CELL_SIZES) )
+        ys.append( ys[-1] + rnd.choice(SYNTH_CELL_SIZES) )
+    cells = rnd.sample( [(i, j) for j in range(side) for i in range(side)], params.areas )
+    # IDs are increasing, with some holes, areas are stored in random order.
+    ids = dict[tuple[int, int], int]()
+    area_id = 0
+    for cell in cells:
+        area_id += rnd.choice( (1, 1, 1, 2, 7) )
+        ids[cell] = area_id
+    rnd.shuffle( cells )
+    all_ids = list( ids.values() )
+
+    out = bytearray()
+    out += _U4.pack( NAV_MAGIC_NUMBER )
+    out += _U4.pack( params.version )
+    if params.version >= 4:
+        out += _U4.pack( bsp_size )
+    if params.version >= 5:
+        out += _U2.pack( len(SYNTH_PLACES) )
+        for place in SYNTH_PLACES:
+            name = place.encode( "ascii" ) + b"\0"
+            out += _U2.pack( len(name) ) + name
+    out += _U4.pack( len(cells) )
+    hiding_spot_ids = list[int]()
+    for i, j in cells:
+        lo = (xs[i], ys[j])
+        hi = (xs[i + 1], ys[j + 1])
+        chance = rnd.random()
+        if chance < params.ignorable * 0.6:
+            flags = 0b0001
+        elif chance < params.ignorable:
+            flags = 0b0010
+        elif chance < params.ignorable * 1.25:
+            # Precise, crouch or not, is never ignored.
+            flags = 0b0101
+        else:
+            flags = 0
+        out += _U4.pack( ids[(i, j)] )
+        out += _U1.pack( flags )
+        out += _VECTOR.pack( *lo, _height(rnd, *lo) )
+        out += _VECTOR.pack( *hi, _height(rnd, *hi) )
+        out += _F4.pack( _height(rnd, hi[0], lo[1]) )
+        out += _F4.pack( _height(rnd, lo[0], hi[1]) )
+
+        # North, east, south, west.
+        connects = list[list[int]]()
+        for neighbour in ((i, j - 1), (i + 1, j), (i, j + 1), (i - 1, j)):
+            connect = list[int]()
+            if neighbour in ids and rnd.random() < params.connectivity:
+                connect.append( ids[neighbour] )
+            connects.append( connect )
+            out += _U4.pack( len(connect) )
+            out += b"".join( _U4.pack(x) for x in connect )
+
+        count = rnd.randint( 0, params.hiding_spots )
+        out += _U1.pack( count )
+        for _ in range( count ):
+            origin = (rnd.uniform( lo[0], hi[0] ), rnd.uniform( lo[1], hi[1] ), 10.0)
+            if params.version == 1:
+                out += _VECTOR.pack( *origin )
+                continue
+            hiding_spot_ids.append( len(hiding_spot_ids) + 1 )
+            out += _U4.pack( hiding_spot_ids[-1] )
+            out += _VECTOR.pack( *origin )
+            out += _U1.pack( rnd.randint(0, 7) )
+
+        count = rnd.randint( 0, params.approach_areas )
+        out += _U1.pack( count )
+        for _ in range( count ):
+            out += _U4.pack( rnd.choice(all_ids) )
+            out += _U4.pack( rnd.choice(all_ids) ) + _U1.pack( rnd.randint(0, 6) )
+            out += _U4.pack( rnd.choice(all_ids) ) + _U1.pack( rnd.randint(0, 6) )
+
+        directions = [d for d, x in enumerate( connects ) if x]
+        count = rnd.randint( 0, params.encounter_spots ) if directions else 0
+        out += _U4.pack( count )
+        for _ in range( count ):
+            source = rnd.choice( directions )
+            target = rnd.choice( directions )
+            spots = rnd.randint( 0, 3 ) if hiding_spot_ids or params.version < 3 else 0
+            if params.version < 3:
+                out += _U4.pack( connects[source][0] )
+                out += _U4.pack( connects[target][0] )
+                out += _VECTOR.pack( *lo, _height(rnd, *lo) )
+                out += _VECTOR.pack( *hi, _height(rnd, *hi) )
+                out += _U1.pack( spots )
+                for _ in range( spots ):
+                    out += _VECTOR.pack( *lo, 0.0 ) + _F4.pack( rnd.random() )
+                continue
+            out += _U4.pack( connects[source][0] ) + _U1.pack( source )
+            out += _U4.pack( connects[target][0] ) + _U1.pack( target )
+            out += _U1.pack( spots )
+            for _ in range( spots ):
+                out += _U4.pack( rnd.choice(hiding_spot_ids) ) + _U1.pack( rnd.randint(0, 255) )
+
+        if params.version >= 5:
+            out += _U2.pack( rnd.randint(0, len( SYNTH_PLACES )) )
+    return bytes( out )
+
+
+def build_bsp (params: SynthParams) -> bytes:
+    """`.BSP` file content, only the entities lump is meaningful."""
+    rnd = random.Random( params.seed )
+    blocks = [
+        '{\n"classname" "worldspawn"\n"wad" "\\\\half-life\\\\valve\\\\halflife.wad"\n"mapversion" "220"\n}\n'
+    ]
+    for _ in range( params.entities ):
+        blocks.append(
+            '{\n'
+            f'"origin" "{rnd.randint(0, 4000)} {rnd.randint(0, 4000)} {rnd.randint(0, 100)}"\n'
+            f'"classname" "{rnd.choice(SYNTH_CLASSNAMES)}"\n'
+            f'"angle" "{rnd.randint(0, 359)}"\n'
+            '}\n'
+        )
+    # Left over from a previous conversion, to be dropped.
+    blocks.append( '{\n"origin" "1 2 3"\n"netname" "nav2ent_5"\n"classname" "info_node"\n}\n' )
+    lumps = [ "".join(blocks).encode("ascii") + b"\0" ]
+    lumps.extend( rnd.randbytes(rnd.randint( 0, 300 )) for _ in range(BSP_LUMP_COUNT - 1) )
+
+    body = bytearray()
+    header = list[int]()
+    for lump in lumps:
+        # Lumps are 4 bytes aligned.
+        body += bytes( -(_BSP_HEADER.size + len(body)) % 4 )
+        header += ( _BSP_HEADER.size + len(body), len(lump) )
+        body += lump
+    return _BSP_HEADER.pack( 30, *header ) + bytes( body )
+
+
+def write_map (path: str | pathlib.Path, params: SynthParams) -> pathlib.Path:
+    """Write `.bsp` & `.nav` of the given path, return the BSP path."""
+    path = pathlib.Path( path )
+    path.parent.mkdir( parents=True, exist_ok=True )
+    bsp = build_bsp( params )
+    bsp_file = path.with_suffix( ".bsp" )
+    bsp_file.write_bytes( bsp )
+    path.with_suffix( ".nav" ).write_bytes( build_nav(params, len( bsp )) )
+    return bsp_file
+
+
+def main (argv: list[str] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m an_nav.synth'
+        , description='Write a synthetic `.bsp` & `.nav` pair.'
+    )
+    parser.add_argument( 'path', type=pathlib.Path, help='Output path, without extension.' )
+    for x in fields( SynthParams ):
+        parser.add_argument(
+            f'--{x.name.replace("_", "-")}'
+            , type=type( x.default )
+            , default=x.default
+            , help=f'Default {x.default}.'
+        )
+    args = vars( parser.parse_args(argv) )
+    path = args.pop( "path" )
+    print( write_map(path, SynthParams( **args )) )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit( main() )
@@ -0,0 +1,104 @@
+"""Thinning of `info_node`s to a node budget, see `--max-nodes`.
+
+Nodes are taken by priority, and skipped when closer than a radius to a node
+already taken (Poisson-disk). The smallest radius that fits the budget is found
+by bisection, each try runs over a grid of that radius.
+"""
+from math import floor, sqrt
+from .kaitai.nav import NavArea
+from .utils import InfoNodeEntity
+
+
+
+THIN_RADIUS_PRECISION: float = 1.0
+"""Bisection stops once the radius is known within it, in world units."""
+THIN_MAX_ITERATIONS: int = 64
+
+
+def _get_node_areas (ent: InfoNodeEntity) -> set[NavArea]:
+    areas = set[NavArea]()
+    for member in ent.merged_nodes or (ent,):
+        areas.add( member.source )
+        if member.target:
+            areas.add( member.target )
+    return areas
+
+
+def get_node_priority (ent: InfoNodeEntity) -> tuple[int, int]:
+    """Higher first: connections of the areas of the node, then its merged node count.
+
+    Junctions & doorways are kept over the middle of open areas.
+    """
+    connections = sum(
+        len( x.entries )
+        for area in _get_node_areas( ent )
+        for x in area.area_adjacents_per_directions
+    )
+    return (connections, len( ent.merged_nodes ))
+
+
+def _select (
+    origins: list[tuple[float, float, float]]
+    , order: list[int]
+    , forced: int
+    , radius: float
+) -> list[int]:
+    """Indices taken in `order`, the first `forced` ones always."""
+    taken = list[int]()
+    cells = dict[tuple[int, int], list[int]]()
+    size = max( radius, THIN_RADIUS_PRECISION )
+    limit = radius * radius
+    for k, i in enumerate( order ):
+        x, y, z = origins[i]
+        cx, cy = floor( x / size ), floor( y / size )
+        if k >= forced and any(
+            (origins[j][0] - x) ** 2 + (origins[j][1] - y) ** 2 + (origins[j][2] - z) ** 2 < limit
+            for dx in (-1, 0, 1)
+            for dy in (-1, 0, 1)
+            for j in cells.get( (cx + dx, cy + dy), () )
+        ):
+            continue
+        taken.append( i )
+        cells.setdefault( (cx, cy), [] ).append( i )
+    return taken
+
+
+def thin_nodes (nodes: list[InfoNodeEntity], max_nodes: int) -> list[InfoNodeEntity]:
+    """At most `max_nodes` of the given nodes, spread over the map, in the same order.
+
+    The best node of each place is always kept, as long as places fit the budget.
+    """
+    if max_nodes < 1:
+        raise ValueError( f"Node budget must be 1 or more, got {max_nodes}" )
+    if len(nodes) <= max_nodes:
+        return list( nodes )
+    origins = [tuple( x.origin ) for x in nodes]
+    priorities = [get_node_priority( x ) for x in nodes]
+    order = sorted( range(len( nodes )), key=lambda i:(-priorities[i][0], -priorities[i][1], i) )
+
+    # Best node of each place first.
+    places = dict[str, int]()
+    for i in order:
+        place = nodes[i].get_source().ks_instances_place
+        places.setdefault( str(place) if place else "", i )
+    forced = list( places.values() )[:max_nodes]
+    forced_set = set( forced )
+    order = forced + [i for i in order if i not in forced_set]
+
+    # Invariant: `hi` fits the budget, `lo` does not.
+    lo = 0.0
+    hi = 2.0 * sqrt( sum(
+        (max( x[axis] for x in origins ) - min( x[axis] for x in origins )) ** 2
+        for axis in range( 3 )
+    ) ) + THIN_RADIUS_PRECISION
+    best = _select( origins, order, len(forced), hi )
+    for _ in range( THIN_MAX_ITERATIONS ):
+        if hi - lo <= THIN_RADIUS_PRECISION:
+            break
+        radius = (lo + hi) / 2.0
+        taken = _select( origins, order, len(forced), radius )
+        if len(taken) <= max_nodes:
+            hi, best = radius, taken
+        else:
+            lo = radius
+    return [nodes[i] for i in sorted( best )]
@@ -1,24 +1,25 @@
 from dataclasses import dataclass, field
+from importlib.util import find_spec
+from math import floor
+import pathlib
 from typing import Type
 from .kaitai.nav import (
-    NavCsczFile
+    NavMesh
     , NavArea
     , NavConnect
     , EncounterSpot
     , Vector
     , Ray
     , DirectionType
-    , VECTOR_ZERO
     , NUM_DIRECTIONS
+    , NAV_LAZY_SECTIONS
     , STEP_HEIGHT
     , HUMAN_HEIGHT_HALF
-    , THE_NAV_AREA_GRID
     , OppositeDirection
 )
-from .kaitai.bsp import (
-    BspFile
-    , LumpContentEntities
-)
+from .kaitai.bsp import read_entities
+from .snapshot import NavSnapshot, SnapshotKey, write_snapshot
+from .stats import PipelineStats, stage
 
 
 
@@ -26,6 +27,8 @@ AREA_INSIDE_SIZE = 200
 ENTITY_OFFSET_Z_ADD = 4
 ENTITY_HULL_DEFAULT_MIN: Vector = Vector.from_list([-16, -16,  0])
 ENTITY_HULL_DEFAULT_MAX: Vector = Vector.from_list([ 16,  16, HUMAN_HEIGHT_HALF])
+NAVAREA_PORTAL_OFFSET: float = 5.0
+"""Distance of connection `info_node`s from their portal, into both areas."""
 
 
 @dataclass( frozen=True, slots=True )
@@ -63,6 +66,12 @@ class InfoNodeEntity ():
                 result += f"_{self.target.id}"
         return result
 
+    def get_source (self) -> NavArea:
+        """Area of the origin, the one of the merged node at the same origin if merged."""
+        if not self.is_merged():
+            return self.source
+        return next( (x for x in self.merged_nodes if x.origin == self.origin), next(iter( self.merged_nodes )) ).source
+
     def get_place (self) -> str:
         if self.is_merged():
             return "__MERGED"
@@ -164,66 +173,188 @@ class InfoNodeEntity ():
         return other and self.origin == other.origin
 
 
-NODE_LIST = dict[InfoNodeEntity, None]()
-def add_node (ent: InfoNodeEntity):
-    if not ent:
-        raise ValueError( "Node is None" )
-    conflict = check_node_intersects( ent )
-    if conflict:
-        merged = conflict.merge( ent )
-        if conflict.is_merged() and ent.is_merged():
-            '''Assimilating a merged node.'''
-            #print( f"Eat({(conflict.get_id(), ent.get_id())})", end=" " )
-        elif conflict is not merged:
-            '''Creating a new merged node.'''
-            #print( f"New({(conflict.get_id(), ent.get_id())})", end=" " )
-            #print( f"DeleteC({conflict.get_id()})", end=" " )
-            NODE_LIST.pop( conflict, None )
-        else:
-            '''Adding a single node.'''
-            #print( f"Combine({(conflict.get_id(), ent.get_id())})", end=" " )
-        # Recursively to check intersects.
-        return add_node( merged )
-    #print( "OK" )
-    NODE_LIST[ent] = None
-    return ent
-def check_node_intersects (ent: InfoNodeEntity):
-    for node in NODE_LIST:
-        if node is ent:
+NODE_INDEX_CELL_SIZE: float = 64.0
+"""Size of a `InfoNodeIndex` cell, in world units."""
+
+
+def iter_node_cells (lo: Vector, hi: Vector, size: float = NODE_INDEX_CELL_SIZE):
+    """Yield XY grid cells overlapped by the given AABB."""
+    for x in range( floor(lo.x / size), floor(hi.x / size) + 1 ):
+        for y in range( floor(lo.y / size), floor(hi.y / size) + 1 ):
+            yield (x, y)
+
+
+class InfoNodeIndex (dict[InfoNodeEntity, None]):
+    """Insertion ordered set of nodes, bucketed by a uniform grid of their AABB.
+
+    Behaves like the plain `dict` it replaces, the grid is kept in sync
+    on every insert/removal so lookups only visit the nearby nodes.
+    """
+    def __init__ (self, cell_size: float = NODE_INDEX_CELL_SIZE):
+        super().__init__()
+        self.cell_size = cell_size
+        self._cells = dict[tuple[int, int], dict[int, InfoNodeEntity]]()
+        """Grid cell -> {insertion sequence: node}."""
+        self._seqs = dict[InfoNodeEntity, int]()
+        """Node -> insertion sequence, mirrors the keys of `self`."""
+        self._nodes = dict[int, InfoNodeEntity]()
+        """Insertion sequence -> stored node."""
+        self._next_seq: int = 0
+        self.intersect_tests: int = 0
+        """AABB intersection tests done by `find_intersects`."""
+
+    def _iter_cells (self, lo: Vector, hi: Vector):
+        return iter_node_cells( lo, hi, self.cell_size )
+
+    def __setitem__ (self, key: InfoNodeEntity, value: None):
+        if key in self:
+            # Same as `dict`, the stored key and its order are kept.
+            return
+        super().__setitem__( key, value )
+        seq = self._next_seq
+        self._next_seq += 1
+        self._seqs[key] = seq
+        self._nodes[seq] = key
+        for cell in self._iter_cells( key.absmin, key.absmax ):
+            self._cells.setdefault( cell, {} )[seq] = key
+
+    def __delitem__ (self, key: InfoNodeEntity):
+        super().__delitem__( key )
+        seq = self._seqs.pop( key )
+        node = self._nodes.pop( seq )
+        for cell in self._iter_cells( node.absmin, node.absmax ):
+            bucket = self._cells[cell]
+            del bucket[seq]
+            if not bucket:
+                del self._cells[cell]
+
+    def pop (self, key: InfoNodeEntity, *default):
+        if key not in self:
+            if default:
+                return default[0]
+            raise KeyError( key )
+        value = self[key]
+        del self[key]
+        return value
+
+    def clear (self):
+        super().clear()
+        self._cells.clear()
+        self._seqs.clear()
+        self._nodes.clear()
+
+    def find_intersects (self, ent: InfoNodeEntity) -> InfoNodeEntity|None:
+        """Return the oldest node that intersects `ent`, other than `ent` itself."""
+        best_seq: int = self._next_seq
+        best: InfoNodeEntity|None = None
+        tests = 0
+        for cell in self._iter_cells( ent.absmin, ent.absmax ):
+            for seq, node in self._cells.get( cell, {} ).items():
+                if seq >= best_seq or node is ent:
+                    continue
+                tests += 1
+                if node.is_intersects( ent ):
+                    best_seq = seq
+                    best = node
+        self.intersect_tests += tests
+        return best
+
+    def find_contains (self, origin: Vector) -> InfoNodeEntity|None:
+        """Return the oldest node that contains `origin`."""
+        best_seq: int = self._next_seq
+        best: InfoNodeEntity|None = None
+        for cell in self._iter_cells( origin, origin ):
+            for seq, node in self._cells.get( cell, {} ).items():
+                if seq >= best_seq:
+                    continue
+                if node.is_inside_of_me( origin ):
+                    best_seq = seq
+                    best = node
+        return best
+
+
+MERGE_ENGINES: tuple[str, ...] = ( "incremental", "cluster" )
+"""Available `iter_navarea_ent` merge engines."""
+
+
+def merge_node_clusters (nodes: list[InfoNodeEntity]) -> list[InfoNodeEntity]:
+    """Merge overlapping nodes in a single pass, without recursion.
+
+    Nodes whose AABB overlap, directly or through other nodes, form a cluster
+    (grid broad-phase, union-find). Each cluster is returned as one merged node
+    at the origin of its first node, or as the node itself if it is alone.
+
+    Parity with `Nav2EntSession.add_node`, fed with the same nodes in the same order:
+    a merged node there keeps the AABB of its first node, so its clusters
+    are always subsets of these ones. Both are identical when every node
+    of a cluster overlaps the first node of that cluster, the returned
+    order then also matches `Nav2EntSession.nodes`. Otherwise, this one merges more.
+    """
+    return build_node_clusters( nodes, find_node_clusters(nodes) )
+
+
+def find_node_clusters (nodes: list[InfoNodeEntity], stats: PipelineStats = None) -> list[list[int]]:
+    """Indices of each cluster of `merge_node_clusters`, sorted, in any cluster order.
+
+    `stats` counts the intersection tests, if given.
+    """
+    parent = list( range(len(nodes)) )
+    def find (i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    tests = 0
+    cells = dict[tuple[int, int], list[int]]()
+    for i, node in enumerate( nodes ):
+        root = find( i )
+        seen = set[int]()
+        for cell in iter_node_cells( node.absmin, node.absmax ):
+            bucket = cells.setdefault( cell, [] )
+            for j in bucket:
+                if j in seen:
+                    continue
+                seen.add( j )
+                other = find( j )
+                if other == root:
+                    continue
+                tests += 1
+                if not nodes[j].is_intersects( node ):
+                    continue
+                # Oldest node is the root.
+                if other < root:
+                    parent[root] = other
+                    root = other
+                else:
+                    parent[other] = root
+            bucket.append( i )
+
+    if stats is not None:
+        stats.count( "intersect_tests", tests )
+    clusters = dict[int, list[int]]()
+    for i in range( len(nodes) ):
+        clusters.setdefault( find(i), [] ).append( i )
+    return list( clusters.values() )
+
+
+def build_node_clusters (nodes: list[InfoNodeEntity], clusters: list[list[int]]) -> list[InfoNodeEntity]:
+    """The merged nodes of `merge_node_clusters`, given its clusters."""
+    result = list[tuple[int, InfoNodeEntity]]()
+    for members in clusters:
+        first = nodes[members[0]]
+        if len(members) == 1:
+            result.append( (members[0], first) )
             continue
-        if node.is_intersects(ent):
-            return node
-    return None
-def check_node_contains (origin: Vector):
-    for node in NODE_LIST:
-        if node.is_inside_of_me(origin):
-            return node
-    return None
-
-
-CONNECT_LIST = dict[NavArea, list[set[NavArea]]]()
-def connect_init (area: NavArea):
-    if area in CONNECT_LIST:
-        return CONNECT_LIST[area]
-    result = CONNECT_LIST[area] = [set[NavArea]()] * NUM_DIRECTIONS
-    return result
-def is_connect_marked (source: NavArea, target: NavArea, dir: DirectionType):
-    connect_init( source )
-    connect_init( target )
-    return (
-        target in CONNECT_LIST[source][dir.value]
-        or source in CONNECT_LIST[target][OppositeDirection(dir).value]
-    )
-def mark_connect (source: NavArea, target: NavArea, dir: DirectionType):
-    connect_init( source )
-    connect_init( target )
-    CONNECT_LIST[source][dir.value].add( target )
-    CONNECT_LIST[target][OppositeDirection(dir).value].add( source )
-def unmark_connect (source: NavArea, target: NavArea, dir: DirectionType):
-    connect_init( source )
-    connect_init( target )
-    CONNECT_LIST[source][dir.value].discard( target )
-    CONNECT_LIST[target][OppositeDirection(dir).value].discard( source )
+        # `Nav2EntSession.add_node` re-inserts the merged node when the 2nd one comes in.
+        merged = type( first )(
+            None
+            , first.origin
+            , merged_nodes=set( nodes[i] for i in members )
+        )
+        result.append( (members[1], merged) )
+    result.sort( key=lambda x:x[0] )
+    return [x for _, x in result]
 
 
 def is_navarea_ignorable (area: NavArea, target: NavArea = None) -> bool:
@@ -240,7 +371,86 @@ def is_navarea_too_high (source: Vector, target: Vector):
     return abs( target.z - source.z ) > STEP_HEIGHT
 
 
+NAV_SPAWN_CLASSNAMES: tuple[str, ...] = (
+    "info_player_start"
+    , "info_player_deathmatch"
+    , "info_player_coop"
+    , "info_vip_start"
+)
+"""Entities players spawn at, areas they can not walk to are unreachable."""
+
+
+def find_navarea_components (areas: list[NavArea]) -> list[list[NavArea]]:
+    """Areas connected either way, each component in `areas` order, in linear time.
+
+    Every area is walked, even ignorable ones, players still crouch & jump through them.
+    """
+    index_of = { id(x): k for k, x in enumerate(areas) }
+    neighbours = [list[int]() for _ in areas]
+    for i, source in enumerate( areas ):
+        for connections in source.area_adjacents_per_directions:
+            for connection in connections.entries:
+                j = index_of.get( id(connection.area) )
+                if j is None or j == i:
+                    continue
+                neighbours[i].append( j )
+                neighbours[j].append( i )
+    labels = [-1] * len(areas)
+    components = list[list[NavArea]]()
+    for i in range( len(areas) ):
+        if labels[i] >= 0:
+            continue
+        labels[i] = len( components )
+        components.append( [] )
+        stack = [i]
+        while stack:
+            for j in neighbours[stack.pop()]:
+                if labels[j] < 0:
+                    labels[j] = labels[i]
+                    stack.append( j )
+    for area, label in zip( areas, labels ):
+        components[label].append( area )
+    return components
+
+
+def iter_spawn_origins (entities: list[dict[str, str]]):
+    """Yield the origin of every `NAV_SPAWN_CLASSNAMES` entity."""
+    for ent in entities:
+        if ent.get( "classname" ) not in NAV_SPAWN_CLASSNAMES or "origin" not in ent:
+            continue
+        try:
+            yield Vector.from_list([ float(x) for x in ent["origin"].split() ])
+        except (ValueError, TypeError):
+            continue
+
+
+def find_navarea_islands (
+    mesh: NavMesh
+    , min_areas: int = 0
+    , spawns: list[Vector] | None = None
+) -> set[NavArea]:
+    """Areas of the components with less than `min_areas` areas, or without any of `spawns`.
+
+    Spawns are matched to the area beneath them, if none of them is on the mesh
+    reachability is not checked at all.
+    """
+    components = find_navarea_components( mesh.nav_areas.entries )
+    reached = set[NavArea]()
+    for origin in spawns or ():
+        area = mesh.nav_area_grid.GetNavArea( origin )
+        if area is not None:
+            reached.add( area )
+    islands = set[NavArea]()
+    for component in components:
+        if len(component) < min_areas or (reached and reached.isdisjoint( component )):
+            islands.update( component )
+    return islands
+
+
 def iter_navarea_ent_encounter (area: NavArea):
+    if area.encounter_spots.ks_instances_is_legacy:
+        # Old data, read and discarded.
+        return
     offset = Vector.from_list([ 0, 0, -HUMAN_HEIGHT_HALF ])
     for spot in area.encounter_spots.entries:
         spot: EncounterSpot = spot
@@ -256,44 +466,33 @@ def iter_navarea_ent_encounter (area: NavArea):
         yield (area, origin+offset, dirr)
 
 
-def iter_navarea_ent_connection (source: NavArea):
-    """Taken from `CNavArea::DrawConnectedAreas`."""
-    for connections in source.area_adjacents_per_directions:
-        dir: DirectionType = connections.ks_instances_direction
-        connections: list[NavConnect] = connections.entries
-        for connection in connections:
-            target: NavArea = connection.area
-            if is_connect_marked( source, target, dir ):
-                continue
-            mark_connect( source, target, dir )
-            f_origin: Vector = VECTOR_ZERO.copy()
-            t_origin: Vector = VECTOR_ZERO.copy()
-            hook_origin: Vector = VECTOR_ZERO.copy()
-            size: float = 5.0
-            hook_origin, _ = source.ComputePortal( target, dir )
-
-            if dir == DirectionType.north:
-                f_origin = hook_origin + Vector.from_list([ 0.0, size, 0.0 ])
-                t_origin = hook_origin + Vector.from_list([ 0.0, -size, 0.0 ])
-            elif dir == DirectionType.south:
-                f_origin = hook_origin + Vector.from_list([ 0.0, -size, 0.0 ])
-                t_origin = hook_origin + Vector.from_list([ 0.0, size, 0.0 ])
-            elif dir == DirectionType.east:
-                f_origin = hook_origin + Vector.from_list([ -size, 0.0, 0.0 ])
-                t_origin = hook_origin + Vector.from_list([ +size, 0.0, 0.0 ])
-            elif dir == DirectionType.west:
-                f_origin = hook_origin + Vector.from_list([ size, 0.0, 0.0 ])
-                t_origin = hook_origin + Vector.from_list([ -size, 0.0, 0.0 ])
-
-            f_origin.z = source.GetZ( f_origin )
-            t_origin.z = target.GetZ( t_origin )
-            drawTo: Vector = target.GetClosestPointOnArea( t_origin )
-            if is_navarea_too_high( f_origin, drawTo ):
-                continue
-            add_origin = Vector.from_list([ 0, 0, ENTITY_OFFSET_Z_ADD ])
-            yield (target, ((f_origin + drawTo) / 2.0) + add_origin)
-            yield (target, f_origin + add_origin)
-            yield (target, drawTo + add_origin)
+def iter_navarea_ent_portal (source: NavArea, target: NavArea, dir: DirectionType):
+    """Yield `(target, origin)` of `info_node`s around the portal of a connection."""
+    size: float = NAVAREA_PORTAL_OFFSET
+    x, y, _ = source.get_portal( target, dir )
+
+    if dir == DirectionType.north:
+        f_origin = Vector( x, y + size, 0.0 )
+        t_origin = Vector( x, y - size, 0.0 )
+    elif dir == DirectionType.south:
+        f_origin = Vector( x, y - size, 0.0 )
+        t_origin = Vector( x, y + size, 0.0 )
+    elif dir == DirectionType.east:
+        f_origin = Vector( x - size, y, 0.0 )
+        t_origin = Vector( x + size, y, 0.0 )
+    elif dir == DirectionType.west:
+        f_origin = Vector( x + size, y, 0.0 )
+        t_origin = Vector( x - size, y, 0.0 )
+
+    f_origin.z = source.GetZ( f_origin )
+    t_origin.z = target.GetZ( t_origin )
+    drawTo: Vector = target.GetClosestPointOnArea( t_origin )
+    if is_navarea_too_high( f_origin, drawTo ):
+        return
+    add_origin = Vector.from_list([ 0, 0, ENTITY_OFFSET_Z_ADD ])
+    yield (target, ((f_origin + drawTo) / 2.0) + add_origin)
+    yield (target, f_origin + add_origin)
+    yield (target, drawTo + add_origin)
 
 
 def iter_navarea_ent_inside (area: NavArea):
@@ -307,9 +506,9 @@ def iter_navarea_ent_inside (area: NavArea):
         yield center
         return
     src = ext.lo
-    target: Vector = VECTOR_ZERO.copy()
     add_x = delta.x / count_x
     add_y = delta.y / count_y
+    target: Vector = center.copy()
     for x in range( count_x ):
         target.update( center )
         if count_x > 1:
@@ -317,29 +516,223 @@ def iter_navarea_ent_inside (area: NavArea):
         for y in range( count_y ):
             if count_y > 1:
                 target.y = src.y + add_y*(y+1)
-            target = area.get_aligned_origin( target )
-            target.z += ENTITY_OFFSET_Z_ADD
-            yield target
-
-
-def iter_navarea_ent (areas: list[NavArea], flags: str = "c"):
-    areas = list( filter((lambda x:not is_navarea_ignorable(x)), areas) )
-    flags_clean = dict.fromkeys( flags.lower(), None )
-    # Processing...
-    for source in areas:
-        for flag in flags_clean:
-            if flag == "a":
-                for target, origin in iter_navarea_ent_connection( source ):
-                    add_node( InfoNodeEntity(source, origin, target) )
-            if flag == "b":
-                for target, origin, _ in iter_navarea_ent_encounter( source ):
-                    add_node( InfoNodeEntity(source, origin, target) )
-            if flag == "c":
-                for origin in iter_navarea_ent_inside( source ):
-                    add_node( InfoNodeEntity(source, origin, None) )
-    # Yield the result
+            # A new vector, yielded ones are owned by the caller.
+            origin = area.get_aligned_origin( target )
+            if origin is None:
+                continue
+            origin.z += ENTITY_OFFSET_Z_ADD
+            yield origin
+
+
+def sample_navarea_ent_inside (areas: list[NavArea]) -> list[list[Vector]]:
+    """Batched `iter_navarea_ent_inside`, one origin list per area.
+
+    Requires NumPy.
+    """
+    from .arrays import NavAreaArrays
+    offsets, origins = NavAreaArrays.from_areas( areas ).sample_inside(
+        AREA_INSIDE_SIZE
+        , ENTITY_OFFSET_Z_ADD
+    )
+    offsets = offsets.tolist()
+    origins = origins.tolist()
+    result = list[list[Vector]]()
+    for i in range( len(areas) ):
+        vectors = list[Vector]()
+        for x, y, z in origins[offsets[i]:offsets[i+1]]:
+            # X & Y are float32 already, Z is not rounded.
+            origin = Vector( x, y )
+            origin.z = z
+            vectors.append( origin )
+        result.append( vectors )
+    return result
+
+
+class Nav2EntSession ():
+    """State of converting one map into `info_node`s.
+
+    Start a new session for each map, nothing is shared between them.
+    """
+    def __init__ (self, mesh: NavMesh = None, stats: PipelineStats = None):
+        self.mesh = mesh
+        """The loaded `.NAV`, owns the area grid & hiding spots."""
+        self.stats = stats
+        """Stages & counters of the build, if any."""
+        self.nodes = InfoNodeIndex()
+        """The `info_node`s built so far."""
+        self.connects = dict[NavArea, list[set[NavArea]]]()
+        """Connections that already have `info_node`s."""
+        self.excluded = set[NavArea]()
+        """Areas without `info_node`s, see `find_navarea_islands`."""
+
+    def add_node (self, ent: InfoNodeEntity, _depth: int = 1):
+        if not ent:
+            raise ValueError( "Node is None" )
+        conflict = self.check_node_intersects( ent )
+        if conflict:
+            if self.stats is not None:
+                self.stats.count( "merges" )
+            merged = conflict.merge( ent )
+            if conflict.is_merged() and ent.is_merged():
+                '''Assimilating a merged node.'''
+                #print( f"Eat({(conflict.get_id(), ent.get_id())})", end=" " )
+            elif conflict is not merged:
+                '''Creating a new merged node.'''
+                #print( f"New({(conflict.get_id(), ent.get_id())})", end=" " )
+                #print( f"DeleteC({conflict.get_id()})", end=" " )
+                self.nodes.pop( conflict, None )
+            else:
+                '''Adding a single node.'''
+                #print( f"Combine({(conflict.get_id(), ent.get_id())})", end=" " )
+            # Recursively to check intersects.
+            return self.add_node( merged, _depth + 1 )
+        #print( "OK" )
+        if self.stats is not None:
+            self.stats.maximum( "add_node_depth", _depth )
+        self.nodes[ent] = None
+        return ent
+    def check_node_intersects (self, ent: InfoNodeEntity):
+        return self.nodes.find_intersects( ent )
+    def check_node_contains (self, origin: Vector):
+        return self.nodes.find_contains( origin )
+
+    def connect_init (self, area: NavArea):
+        if area in self.connects:
+            return self.connects[area]
+        result = self.connects[area] = [set[NavArea]()] * NUM_DIRECTIONS
+        return result
+    def is_connect_marked (self, source: NavArea, target: NavArea, dir: DirectionType):
+        self.connect_init( source )
+        self.connect_init( target )
+        return (
+            target in self.connects[source][dir.value]
+            or source in self.connects[target][OppositeDirection(dir).value]
+        )
+    def mark_connect (self, source: NavArea, target: NavArea, dir: DirectionType):
+        self.connect_init( source )
+        self.connect_init( target )
+        self.connects[source][dir.value].add( target )
+        self.connects[target][OppositeDirection(dir).value].add( source )
+    def unmark_connect (self, source: NavArea, target: NavArea, dir: DirectionType):
+        self.connect_init( source )
+        self.connect_init( target )
+        self.connects[source][dir.value].discard( target )
+        self.connects[target][OppositeDirection(dir).value].discard( source )
+
+    def filter_navarea_buildable (self, areas: list[NavArea] = None) -> list[NavArea]:
+        """Areas to build `info_node`s of, all of the mesh if None, neither ignorable nor excluded."""
+        if areas is None:
+            areas = self.mesh.nav_areas.entries
+        return [
+            x for x in areas
+            if not is_navarea_ignorable( x ) and x not in self.excluded
+        ]
+
+    def iter_navarea_connect_unmarked (self, source: NavArea):
+        """Yield `(target, dir)` of connections without `info_node`s yet, then mark them."""
+        for connections in source.area_adjacents_per_directions:
+            dir: DirectionType = connections.ks_instances_direction
+            connections: list[NavConnect] = connections.entries
+            for connection in connections:
+                target: NavArea = connection.area
+                if self.is_connect_marked( source, target, dir ):
+                    continue
+                self.mark_connect( source, target, dir )
+                yield (target, dir)
+
+    def iter_navarea_ent_connection (self, source: NavArea):
+        """Taken from `CNavArea::DrawConnectedAreas`."""
+        for target, dir in self.iter_navarea_connect_unmarked( source ):
+            yield from iter_navarea_ent_portal( source, target, dir )
+
+    def iter_navarea_ent_candidates (
+        self
+        , areas: list[NavArea] = None
+        , flags: str = "c"
+        , batched: bool|None = None
+    ):
+        """Yield every `info_node` candidate of the given areas, before merging.
+
+        `batched` selects `sample_navarea_ent_inside` for flag "c",
+        default is to use it when NumPy is installed.
+        """
+        areas = self.filter_navarea_buildable( areas )
+        flags_clean = dict.fromkeys( flags.lower(), None )
+        if batched is None:
+            batched = find_spec( "numpy" ) is not None
+        inside = None
+        if batched and "c" in flags_clean:
+            with stage( self.stats, "candidates.c" ):
+                inside = sample_navarea_ent_inside( areas )
+        # Processing...
+        for i, source in enumerate( areas ):
+            for flag in flags_clean:
+                candidates = self._iter_navarea_ent_flag( source, flag, inside[i] if inside is not None else None )
+                if self.stats is None:
+                    yield from candidates
+                    continue
+                # Built apart from the caller's work on them.
+                with self.stats.stage( f"candidates.{flag}" ):
+                    candidates = list( candidates )
+                self.stats.count( "candidates", len(candidates) )
+                yield from candidates
+
+    def _iter_navarea_ent_flag (self, source: NavArea, flag: str, inside: list[Vector] = None):
+        if flag == "a":
+            for target, origin in self.iter_navarea_ent_connection( source ):
+                yield InfoNodeEntity( source, origin, target )
+        if flag == "b":
+            for target, origin, _ in iter_navarea_ent_encounter( source ):
+                yield InfoNodeEntity( source, origin, target )
+        if flag == "c":
+            for origin in (
+                inside
+                if inside is not None
+                else iter_navarea_ent_inside( source )
+            ):
+                yield InfoNodeEntity( source, origin, None )
+
+    def iter_navarea_ent (
+        self
+        , areas: list[NavArea] = None
+        , flags: str = "c"
+        , batched: bool|None = None
+        , merge: str = "incremental"
+    ):
+        """Build the merged `info_node`s of the given areas, sorted by place & ID.
+
+        `merge` is one of `MERGE_ENGINES`:
+          - "incremental", `add_node` each candidate in turn,
+          - "cluster", `merge_node_clusters` over all candidates at once.
+        """
+        if merge not in MERGE_ENGINES:
+            raise ValueError( f"Unknown merge engine {merge}" )
+        candidates = self.iter_navarea_ent_candidates( areas, flags, batched )
+        if self.stats is not None:
+            candidates = list( candidates )
+        with stage( self.stats, "merge" ):
+            if merge == "incremental":
+                tests = self.nodes.intersect_tests
+                for ent in candidates:
+                    self.add_node( ent )
+                nodes = self.nodes
+                if self.stats is not None:
+                    self.stats.count( "intersect_tests", self.nodes.intersect_tests - tests )
+            else:
+                candidates = list( candidates )
+                clusters = find_node_clusters( candidates, self.stats )
+                nodes = build_node_clusters( candidates, clusters )
+                if self.stats is not None:
+                    self.stats.count( "merges", len(candidates) - len(clusters) )
+        with stage( self.stats, "sort" ):
+            nodes = list( iter_sorted_nodes(nodes) )
+        yield from nodes
+
+
+def iter_sorted_nodes (nodes: list[InfoNodeEntity]):
+    """Yield merged nodes sorted by place & ID, as written into `.ent`."""
     for ent in sorted(
-        NODE_LIST
+        nodes
         , key=(lambda x:
             (x.get_place()
             , [int(v) for v in x.get_id().split(";")])
@@ -350,19 +743,88 @@ def iter_navarea_ent (areas: list[NavArea], flags: str = "c"):
         yield ent
 
 
-def load_navarea (path: str):
-    the_nav = NavCsczFile.from_file( path )
+def iter_navarea_ent (
+    areas: list[NavArea]
+    , flags: str = "c"
+    , batched: bool|None = None
+    , merge: str = "incremental"
+):
+    """Same as `Nav2EntSession.iter_navarea_ent`, within a new session."""
+    return Nav2EntSession().iter_navarea_ent( areas, flags, batched, merge )
+
+
+NAV_FLAG_SECTIONS = dict[str, tuple[str, ...]](
+    a=()
+    , b=("hiding_spots", "encounter_spots")
+    , c=()
+)
+"""Build flag -> `NAV_LAZY_SECTIONS` that it needs."""
+
+
+def load_navmesh (
+    path: str
+    , flags: str = None
+    , cache_dir: str = None
+    , stats: PipelineStats = None
+) -> NavMesh:
+    """Load a `.NAV` file, with its areas connected to each other.
+
+    Given build `flags`, sections they do not need are parsed on first access.
+    Given `cache_dir`, the mesh is loaded from its snapshot if the file did not change,
+    otherwise a snapshot is written there once loaded.
+    """
+    if cache_dir is not None:
+        with stage( stats, "nav.snapshot" ):
+            key = SnapshotKey.from_file( path )
+            snapshot_path = pathlib.Path( cache_dir, key.filename() )
+            snapshot = NavSnapshot.open( snapshot_path, key )
+            if snapshot is not None:
+                return snapshot.to_mesh()
+        the_nav = load_navmesh( path, flags, stats=stats )
+        with stage( stats, "nav.snapshot" ):
+            snapshot_path.parent.mkdir( parents=True, exist_ok=True )
+            write_snapshot( the_nav, snapshot_path, key )
+        return the_nav
+    lazy_sections = ()
+    if flags is not None:
+        needed = set[str]()
+        for flag in flags.lower():
+            needed.update( NAV_FLAG_SECTIONS.get(flag, ()) )
+        lazy_sections = tuple( x for x in NAV_LAZY_SECTIONS if x not in needed )
+    with stage( stats, "nav.parse" ):
+        the_nav = NavMesh.from_file( path, lazy_sections )
     areas: list[NavArea] = the_nav.nav_areas.entries
-    THE_NAV_AREA_GRID.load( areas )
+    with stage( stats, "nav.grid" ):
+        the_nav.nav_area_grid.load( areas )
     # Allow areas to connect to each other, etc.
-    for area in areas:
-        area.PostLoad()
-    return (the_nav.version, areas)
+    with stage( stats, "nav.post_load" ):
+        for area in areas:
+            area.PostLoad()
+    return the_nav
+
+
+def load_navarea (path: str):
+    the_nav = load_navmesh( path )
+    return (the_nav.version, the_nav.nav_areas.entries)
+
+
+def load_navarea_arrays (path: str, cache_dir: str = None):
+    """Same as `load_navarea`, but areas are returned as `arrays.NavAreaArrays`.
+
+    Requires NumPy. A snapshot in `cache_dir` is used as is, without any object.
+    """
+    from .arrays import NavAreaArrays
+    if cache_dir is not None:
+        key = SnapshotKey.from_file( path )
+        snapshot = NavSnapshot.open( pathlib.Path(cache_dir, key.filename()), key )
+        if snapshot is not None:
+            return (snapshot.version, snapshot.to_arrays())
+    the_nav = load_navmesh( path, cache_dir=cache_dir )
+    places = the_nav.places.entries if the_nav.ks_instances_can_has_places else None
+    return (the_nav.version, NavAreaArrays.from_areas( the_nav.nav_areas.entries, places ))
 
 
-def load_entities (path: str):
-    the_bsp = BspFile.from_file( path )
-    lump_ents: LumpContentEntities = the_bsp.lumps[BspFile.LumpType.entities.value].ks_instances_content
+def load_entities (path: str, parser: str = None):
     return list(
         filter(
             (
@@ -372,6 +834,6 @@ def load_entities (path: str):
                     and x.get("classname", "info_node")
                 )
             )
-            , lump_ents.blocks
+            , read_entities( path, parser )
         )
     )
@@ -1 +1,8 @@
-import an_nav.__main__
+from multiprocessing import freeze_support
+from an_nav.__main__ import main
+
+
+
+if __name__ == "__main__":
+    freeze_support()
+    raise SystemExit( main() )